@@ -4,9 +4,12 @@ Performs a valid convolution on grayscale images.
 """
 
 import numpy as np
+use_fft = __import__('fft_convolve').use_fft
+fft_convolve = __import__('fft_convolve').fft_convolve
+correlate = __import__('windows').correlate
 
 
-def convolve_grayscale_valid(images, kernel):
+def convolve_grayscale_valid(images, kernel, method='auto'):
     """
     Performs a valid convolution on grayscale images.
 
@@ -15,6 +18,7 @@ def convolve_grayscale_valid(images, kernel):
       Multiple grayscale images
     - kernel: numpy.ndarray of shape (kh, kw)
       Kernel for the convolution
+    - method: 'direct', 'fft', or 'auto' to pick the cheaper of the two
 
     Returns:
     - numpy.ndarray containing the convolved images
@@ -24,13 +28,7 @@ def convolve_grayscale_valid(images, kernel):
     output_h = h - kh + 1
     output_w = w - kw + 1
 
-    output = np.zeros((m, output_h, output_w))
+    if use_fft(method, (h, w), kernel, (output_h, output_w)):
+        return fft_convolve(images[..., np.newaxis], kernel[..., np.newaxis])
 
-    for i in range(output_h):
-        for j in range(output_w):
-            output[:, i, j] = np.sum(
-                images[:, i:i+kh, j:j+kw] * kernel,
-                axis=(1, 2)
-            )
-
-    return output
+    return correlate(images, kernel)
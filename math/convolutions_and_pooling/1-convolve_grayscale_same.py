@@ -3,9 +3,14 @@
 
 
 import numpy as np
+use_fft = __import__('fft_convolve').use_fft
+fft_convolve = __import__('fft_convolve').fft_convolve
+correlate = __import__('windows').correlate
+separate = __import__('separable').separate
+separable_correlate = __import__('separable').separable_correlate
 
 
-def convolve_grayscale_same(images, kernel):
+def convolve_grayscale_same(images, kernel, method='auto', separable=None):
     """
     Performs a same convolution on grayscale images.
 
@@ -14,6 +19,9 @@ def convolve_grayscale_same(images, kernel):
 images
     - kernel (numpy.ndarray): shape (kh, kw) containing the kernel for the
 convolution
+    - method (str): 'direct', 'fft', or 'auto' to pick the cheaper of the two
+    - separable (bool or None): True to run a rank-1 kernel as two 1D
+passes, False to never do so, None to detect it automatically
 
     Returns:
     - numpy.ndarray: shape (m, h, w) containing the convolved images
@@ -24,16 +32,13 @@ convolution
     pad_h = kh // 2
     pad_w = kw // 2
 
-    padded = np.pad(
-        images,
-        ((0, 0), (pad_h, pad_h), (pad_w, pad_w)),
-        mode='constant'
-    )
-    output = np.zeros((m, h, w))
-
-    for i in range(h):
-        for j in range(w):
-            region = padded[:, i:i + kh, j:j + kw]
-            output[:, i, j] = np.sum(region * kernel, axis=(1, 2))
-
-    return output
+    fft = use_fft(method, (h, w), kernel, (h, w))
+    factors = None if method == 'fft' else separate(kernel, separable)
+    if factors is not None:
+        output = separable_correlate(images, *factors, (pad_h, pad_w))
+    elif fft:
+        output = fft_convolve(images[..., np.newaxis],
+                              kernel[..., np.newaxis], (pad_h, pad_w))
+    else:
+        output = correlate(images, kernel, (pad_h, pad_w))
+    return output[:, :h, :w]
@@ -4,9 +4,12 @@ padding."""
 
 
 import numpy as np
+use_fft = __import__('fft_convolve').use_fft
+fft_convolve = __import__('fft_convolve').fft_convolve
+correlate = __import__('windows').correlate
 
 
-def convolve_grayscale_padding(images, kernel, padding):
+def convolve_grayscale_padding(images, kernel, padding, method='auto'):
     """
     Performs a convolution on grayscale images with custom padding.
 
@@ -14,6 +17,7 @@ def convolve_grayscale_padding(images, kernel, padding):
     - images (numpy.ndarray): shape (m, h, w), multiple grayscale images
     - kernel (numpy.ndarray): shape (kh, kw), the kernel for the convolution
     - padding (tuple): (ph, pw), the padding for the height and width
+    - method (str): 'direct', 'fft', or 'auto' to pick the cheaper of the two
 
     Returns:
     - numpy.ndarray: convolved images of shape (m, h + 2*ph - kh + 1, w + 2*pw
@@ -23,14 +27,10 @@ def convolve_grayscale_padding(images, kernel, padding):
     kh, kw = kernel.shape
     ph, pw = padding
 
-    padded = np.pad(images, ((0, 0), (ph, ph), (pw, pw)), mode='constant')
     out_h = h + 2 * ph - kh + 1
     out_w = w + 2 * pw - kw + 1
-    output = np.zeros((m, out_h, out_w))
+    if use_fft(method, (h, w), kernel, (out_h, out_w)):
+        return fft_convolve(images[..., np.newaxis], kernel[..., np.newaxis],
+                            padding)
 
-    for i in range(out_h):
-        for j in range(out_w):
-            region = padded[:, i:i + kh, j:j + kw]
-            output[:, i, j] = np.sum(region * kernel, axis=(1, 2))
-
-    return output
+    return correlate(images, kernel, padding)
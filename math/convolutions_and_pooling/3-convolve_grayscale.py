@@ -4,9 +4,13 @@ padding."""
 
 
 import numpy as np
+use_fft = __import__('fft_convolve').use_fft
+fft_convolve = __import__('fft_convolve').fft_convolve
+correlate = __import__('windows').correlate
 
 
-def convolve_grayscale(images, kernel, padding='same', stride=(1, 1)):
+def convolve_grayscale(images, kernel, padding='same', stride=(1, 1),
+                       method='auto'):
     """
     Performs a convolution on grayscale images with custom padding and stride.
 
@@ -15,6 +19,7 @@ def convolve_grayscale(images, kernel, padding='same', stride=(1, 1)):
     - kernel (numpy.ndarray): shape (kh, kw), the kernel for the convolution
     - padding (str or tuple): 'same', 'valid', or (ph, pw)
     - stride (tuple): (sh, sw), the stride for the convolution
+    - method (str): 'direct', 'fft', or 'auto' to pick the cheaper of the two
 
     Returns:
     - numpy.ndarray: convolved images
@@ -31,14 +36,10 @@ def convolve_grayscale(images, kernel, padding='same', stride=(1, 1)):
     else:  # 'valid'
         ph = pw = 0
 
-    padded = np.pad(images, ((0, 0), (ph, ph), (pw, pw)), mode='constant')
-    out_h = (padded.shape[1] - kh) // sh + 1
-    out_w = (padded.shape[2] - kw) // sw + 1
-    output = np.zeros((m, out_h, out_w))
+    out_h = (h + 2 * ph - kh) // sh + 1
+    out_w = (w + 2 * pw - kw) // sw + 1
+    if use_fft(method, (h, w), kernel, (out_h, out_w)):
+        return fft_convolve(images[..., np.newaxis], kernel[..., np.newaxis],
+                            (ph, pw), stride)
 
-    for i in range(out_h):
-        for j in range(out_w):
-            region = padded[:, i * sh:i * sh + kh, j * sw:j * sw + kw]
-            output[:, i, j] = np.sum(region * kernel, axis=(1, 2))
-
-    return output
+    return correlate(images, kernel, (ph, pw), stride)
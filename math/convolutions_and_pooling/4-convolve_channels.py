@@ -3,9 +3,13 @@
 
 
 import numpy as np
+use_fft = __import__('fft_convolve').use_fft
+fft_convolve = __import__('fft_convolve').fft_convolve
+correlate = __import__('windows').correlate
 
 
-def convolve_channels(images, kernel, padding='valid', stride=(1, 1)):
+def convolve_channels(images, kernel, padding='valid', stride=(1, 1),
+                      method='auto'):
     """
     Performs a convolution on RGB images.
 
@@ -14,6 +18,7 @@ def convolve_channels(images, kernel, padding='valid', stride=(1, 1)):
     - kernel: np.ndarray of shape (kh, kw, c)
     - padding: 'same', 'valid', or (ph, pw)
     - stride: (sh, sw)
+    - method: 'direct', 'fft', or 'auto' to pick the cheaper of the two
 
     Returns:
     - np.ndarray: convolved images of shape (m, out_h, out_w)
@@ -42,21 +47,9 @@ def convolve_channels(images, kernel, padding='valid', stride=(1, 1)):
     else:
         raise ValueError("Invalid padding type")
 
-    # Pad
-    images_padded = np.pad(
-        images, ((0, 0), (ph, ph), (pw, pw), (0, 0)),
-        mode='constant'
-    )
-
     out_h = (h + 2 * ph - kh) // sh + 1
     out_w = (w + 2 * pw - kw) // sw + 1
-    output = np.zeros((m, out_h, out_w))
-
-    for i in range(out_h):
-        for j in range(out_w):
-            region = images_padded[
-                :, i * sh:i * sh + kh, j * sw:j * sw + kw, :
-            ]
-            output[:, i, j] = np.sum(region * kernel, axis=(1, 2, 3))
+    if use_fft(method, (h, w), kernel, (out_h, out_w)):
+        return fft_convolve(images, kernel, (ph, pw), stride)
 
-    return output
+    return correlate(images, kernel, (ph, pw), stride)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Benchmarks the direct convolution against the per-pixel loop."""
+
+
+import sys
+import time
+import numpy as np
+convolve = __import__('5-convolve').convolve
+
+
+def convolve_loop(images, kernel, padding='same', stride=(1, 1)):
+    """
+    Reference implementation looping in Python over every output pixel.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w, c)
+    - kernel: np.ndarray of shape (kh, kw, c)
+    - padding: 'same', 'valid', or (ph, pw)
+    - stride: tuple of (sh, sw)
+
+    Returns:
+    - np.ndarray: convolved images
+    """
+    m, h, w, c = images.shape
+    kh, kw = kernel.shape[:2]
+    sh, sw = stride
+
+    if isinstance(padding, tuple):
+        ph, pw = padding
+    elif padding == 'same':
+        ph = ((h - 1) * sh + kh - h) // 2 + 1
+        pw = ((w - 1) * sw + kw - w) // 2 + 1
+    else:
+        ph = pw = 0
+
+    padded = np.pad(images, ((0, 0), (ph, ph), (pw, pw), (0, 0)),
+                    mode='constant')
+    out_h = (h + 2 * ph - kh) // sh + 1
+    out_w = (w + 2 * pw - kw) // sw + 1
+    output = np.zeros((m, out_h, out_w))
+
+    for i in range(out_h):
+        for j in range(out_w):
+            region = padded[:, i * sh:i * sh + kh, j * sw:j * sw + kw, :]
+            output[:, i, j] = np.sum(region * kernel, axis=(1, 2, 3))
+
+    return output
+
+
+def best_time(func, *args, repeat=3):
+    """Returns the best wall time of func(*args) over repeat runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    np.random.seed(0)
+    images = np.random.rand(8, size, size, 3)
+    kernel = np.random.rand(3, 3, 3)
+
+    for padding in ('same', 'valid', (2, 4)):
+        expected = convolve_loop(images, kernel, padding)
+        result = convolve(images, kernel, padding, method='direct')
+        assert np.allclose(result, expected)
+        t_loop = best_time(convolve_loop, images, kernel, padding)
+        t_direct = best_time(convolve, images, kernel, padding, (1, 1),
+                             'direct')
+        print("{:>8}: loop {:.4f}s  direct {:.4f}s  speedup {:.1f}x".format(
+            str(padding), t_loop, t_direct, t_loop / t_direct))
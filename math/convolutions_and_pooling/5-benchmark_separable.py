@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Benchmarks separable two-pass convolution against the 2D path."""
+
+
+import sys
+import time
+import numpy as np
+convolve_grayscale_same = __import__(
+    '1-convolve_grayscale_same').convolve_grayscale_same
+convolve = __import__('5-convolve').convolve
+
+
+def best_time(func, *args, repeat=3, **kwargs):
+    """Returns the best wall time of func(*args, **kwargs) over repeat runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    np.random.seed(0)
+    gray = np.random.rand(16, size, size)
+    rgb = np.random.rand(16, size, size, 3)
+
+    for k in (3, 7, 15, 31):
+        gauss = np.exp(-np.linspace(-2, 2, k) ** 2)
+        kernel = np.outer(gauss, gauss)
+        cases = (
+            ('grayscale_same', convolve_grayscale_same, gray, kernel),
+            ('convolve', convolve, rgb, kernel[..., np.newaxis] * np.ones(3)),
+        )
+        for name, func, images, weights in cases:
+            t_2d = best_time(func, images, weights, method='direct',
+                             separable=False)
+            t_1d = best_time(func, images, weights, method='direct',
+                             separable=True)
+            print("{:>14} {:2d}x{:<2d}: 2D {:.4f}s  separable {:.4f}s  "
+                  "speedup {:.1f}x".format(name, k, k, t_2d, t_1d,
+                                           t_2d / t_1d))
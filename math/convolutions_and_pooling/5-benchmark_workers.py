@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Benchmarks convolve and pool scaling with the number of workers."""
+
+
+import sys
+import time
+import numpy as np
+convolve = __import__('5-convolve').convolve
+pool = __import__('6-pool').pool
+
+
+def best_time(func, repeat=3, **kwargs):
+    """Returns the best wall time of func(**kwargs) over repeat runs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(**kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    m = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    np.random.seed(0)
+    images = np.random.rand(m, 128, 128, 3)
+    kernel = np.random.rand(5, 5, 3, 8)
+
+    cases = {
+        'convolve': lambda **kw: convolve(images, kernel, 'same',
+                                          method='direct', **kw),
+        'pool': lambda **kw: pool(images, (3, 3), (1, 1), 'max', **kw),
+    }
+    for name, func in cases.items():
+        base = best_time(func, workers=1)
+        for workers in (1, 2, 4, 8):
+            t = best_time(func, workers=workers)
+            print("{:>8} workers={}: {:.4f}s  speedup {:.2f}x".format(
+                name, workers, t, base / t))
@@ -3,33 +3,67 @@
 
 
 import numpy as np
+use_fft = __import__('fft_convolve').use_fft
+fft_convolve = __import__('fft_convolve').fft_convolve
+correlate = __import__('windows').correlate
+run_batches = __import__('batching').run_batches
+separate = __import__('separable').separate
+separable_correlate = __import__('separable').separable_correlate
 
 
-def convolve(images, kernel, padding='same', stride=(1, 1)):
+def convolve(images, kernel, padding='same', stride=(1, 1), method='auto',
+             batch_size=None, max_memory=None, out=None, workers=None,
+             separable=None, dilation=(1, 1), groups=1):
     """
     Performs a convolution on grayscale or RGB images.
 
     Parameters:
     - images: np.ndarray of shape (m, h, w) or (m, h, w, c)
-    - kernel: np.ndarray of shape (kh, kw) or (kh, kw, c)
+    - kernel: np.ndarray of shape (kh, kw) or (kh, kw, c), or a bank of nc
+      filters of shape (kh, kw, nc) or (kh, kw, c, nc)
     - padding: 'same', 'valid', or (ph, pw)
     - stride: tuple of (sh, sw)
+    - method: 'direct', 'fft', or 'auto' to pick the cheaper of the two
+    - batch_size: maximum number of images convolved at once, or None
+    - max_memory: approximate working memory budget in bytes, or None
+    - out: array to write the result into, or path of a .npy file to
+      create as a memory map; a new array is returned when None
+    - workers: number of threads sharing the image batch, or None
+    - separable: True to run a rank-1 kernel as two 1D passes, False to
+      never do so, None to detect it automatically
+    - dilation: tuple of (dh, dw), the spacing between kernel taps for an
+      atrous convolution
+    - groups: number of channel groups; with a (kh, kw, c // groups, nc)
+      kernel every group of input channels feeds nc // groups outputs,
+      groups=c with a (kh, kw, 1, nc) kernel is a depthwise convolution
 
     Returns:
-    - np.ndarray: convolved images
+    - np.ndarray: convolved images of shape (m, out_h, out_w), or
+      (m, out_h, out_w, nc) for a filter bank
     """
     if images.ndim == 3:
         m, h, w = images.shape
         c = 1
         images = images[..., np.newaxis]
-        kernel = kernel[..., np.newaxis]
+        kernel = kernel[:, :, np.newaxis]
     elif images.ndim == 4:
         m, h, w, c = images.shape
     else:
         raise ValueError("Images must be 3D or 4D")
 
-    kh, kw = kernel.shape[:2]
+    if not isinstance(groups, int) or groups < 1 or c % groups:
+        raise ValueError("groups must be a positive divisor of the channels")
+    if groups > 1 and (kernel.ndim != 4 or kernel.shape[3] % groups):
+        raise ValueError("Grouped kernels must be (kh, kw, c // groups, nc)"
+                         " with nc divisible by groups")
+    if kernel.ndim not in (3, 4) or kernel.shape[2] != c // groups:
+        raise ValueError("Kernel channels must match image channels")
+
     sh, sw = stride
+    dh, dw = dilation
+    # Extent of the dilated kernel, its taps are read sparsely
+    kh = (kernel.shape[0] - 1) * dh + 1
+    kw = (kernel.shape[1] - 1) * dw + 1
 
     if isinstance(padding, tuple):
         ph, pw = padding
@@ -41,19 +75,28 @@ def convolve(images, kernel, padding='same', stride=(1, 1)):
     else:
         raise ValueError("Invalid padding type")
 
-    images_padded = np.pad(images,
-                           ((0, 0), (ph, ph), (pw, pw), (0, 0)),
-                           mode='constant')
-
     out_h = (h + 2 * ph - kh) // sh + 1
     out_w = (w + 2 * pw - kw) // sw + 1
-    output = np.zeros((m, out_h, out_w))
+    out_shape = (out_h, out_w) + kernel.shape[3:]
+    nc = kernel.shape[3] if kernel.ndim == 4 else 1
 
-    for i in range(out_h):
-        for j in range(out_w):
-            region = images_padded[
-                :, i * sh:i * sh + kh, j * sw:j * sw + kw, :
-            ]
-            output[:, i, j] = np.sum(region * kernel, axis=(1, 2, 3))
+    fft = use_fft(method, (h, w), kernel, (out_h, out_w), dilation)
+    factors = None if method == 'fft' else separate(kernel, separable)
+    options = {'dilation': dilation}
+    if factors is not None:
+        engine, weights = separable_correlate, factors
+        image_bytes = 8 * out_h * (w * c + out_w * 3)
+    elif fft:
+        engine, weights = fft_convolve, (kernel,)
+        options['groups'] = groups
+        size = (h + kh + ph) * (w + kw + pw)
+        image_bytes = 8 * (size * (c + 2 * nc) + out_h * out_w * nc)
+    else:
+        engine, weights = correlate, (kernel,)
+        options['groups'] = groups
+        image_bytes = 8 * out_h * out_w * (c + 3 * nc)
 
-    return output
+    return run_batches(
+        lambda batch: engine(batch, *weights, (ph, pw), stride, **options),
+        images, out_shape, batch_size, max_memory, image_bytes, out, workers
+    )
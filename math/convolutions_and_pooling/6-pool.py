@@ -3,9 +3,14 @@
 
 
 import numpy as np
+window_view = __import__('windows').window_view
+box_sum = __import__('summed_area').box_sum
+run_batches = __import__('batching').run_batches
 
 
-def pool(images, kernel_shape, stride, mode='max'):
+def pool(images, kernel_shape, stride, mode='max', batch_size=None,
+         max_memory=None, out=None, workers=None, return_indices=False,
+         indices_out=None):
     """
     Performs pooling on images.
 
@@ -14,9 +19,19 @@ def pool(images, kernel_shape, stride, mode='max'):
     - kernel_shape: tuple of (kh, kw)
     - stride: tuple of (sh, sw)
     - mode: 'max' or 'avg'
+    - batch_size: maximum number of images pooled at once, or None
+    - max_memory: approximate working memory budget in bytes, or None
+    - out: array to write the result into, or path of a .npy file to
+      create as a memory map; a new array is returned when None
+    - workers: number of threads sharing the image batch, or None
+    - return_indices: if True, max pooling also returns the flat index
+      (row * w + col) of each maximum within its image and channel
+    - indices_out: like out, where to write the argmax indices
 
     Returns:
     - np.ndarray: pooled images
+    - np.ndarray of the same shape with the argmax indices, only when
+      return_indices is True
     """
     m, h, w, c = images.shape
     kh, kw = kernel_shape
@@ -24,14 +39,83 @@ def pool(images, kernel_shape, stride, mode='max'):
 
     out_h = (h - kh) // sh + 1
     out_w = (w - kw) // sw + 1
-    pooled = np.zeros((m, out_h, out_w, c))
+    if return_indices:
+        if mode != 'max':
+            raise ValueError("return_indices requires mode='max'")
+        # The maxima and their indices are written chunk by chunk together
+        return run_batches(
+            lambda batch: pool_argmax(batch, kernel_shape, stride),
+            images, (out_h, out_w, c), batch_size, max_memory,
+            40 * out_h * out_w * c, (out, indices_out), workers,
+            (float, int)
+        )
 
-    for i in range(out_h):
-        for j in range(out_w):
-            region = images[:, i * sh:i * sh + kh, j * sw:j * sw + kw, :]
-            if mode == 'max':
-                pooled[:, i, j, :] = np.max(region, axis=(1, 2))
-            elif mode == 'avg':
-                pooled[:, i, j, :] = np.mean(region, axis=(1, 2))
+    return run_batches(
+        lambda batch: pool_windows(batch, kernel_shape, stride, mode),
+        images, (out_h, out_w, c), batch_size, max_memory,
+        16 * out_h * out_w * c, out, workers
+    )
+
+
+def pool_windows(images, kernel_shape, stride, mode):
+    """
+    Pools a batch of images in one pass over its window view; average
+    pooling reads its window sums from a summed-area table instead.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w, c)
+    - kernel_shape: tuple of (kh, kw)
+    - stride: tuple of (sh, sw)
+    - mode: 'max' or 'avg'
+
+    Returns:
+    - np.ndarray of shape (m, out_h, out_w, c)
+    """
+    kh, kw = kernel_shape
+    if mode == 'avg':
+        return box_sum(images, kernel_shape, stride=stride) / (kh * kw)
+
+    windows = window_view(images, kernel_shape, stride)
+
+    # Reduce one kernel tap at a time over strided views of the batch
+    pooled = windows[:, :, :, 0, 0].astype(float)
+    for i in range(kh):
+        for j in range(kw):
+            if i or j:
+                np.maximum(pooled, windows[:, :, :, i, j], out=pooled)
 
     return pooled
+
+
+def pool_argmax(images, kernel_shape, stride):
+    """
+    Finds the maximum of every pooling window and its position.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w, c)
+    - kernel_shape: tuple of (kh, kw)
+    - stride: tuple of (sh, sw)
+
+    Returns:
+    - np.ndarray of shape (m, out_h, out_w, c) with the window maxima
+    - np.ndarray of the same shape with the flat index (row * w + col) of
+      the first maximum of each window
+    """
+    w = images.shape[2]
+    kh, kw = kernel_shape
+    sh, sw = stride
+    windows = window_view(images, kernel_shape, stride)
+    out_h, out_w = windows.shape[1:3]
+
+    best = windows[:, :, :, 0, 0].astype(float)
+    taps = np.zeros(best.shape, dtype=int)
+    for i in range(kh):
+        for j in range(kw):
+            tap = windows[:, :, :, i, j]
+            better = tap > best
+            np.copyto(best, tap, where=better)
+            taps[better] = i * kw + j
+
+    rows = np.arange(out_h)[:, np.newaxis, np.newaxis] * sh + taps // kw
+    cols = np.arange(out_w)[:, np.newaxis] * sw + taps % kw
+    return best, rows * w + cols
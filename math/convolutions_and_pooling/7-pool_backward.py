@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Module that performs back propagation over a pooling layer."""
+
+
+import numpy as np
+
+
+def pool_backward(dA, images_shape, kernel_shape, stride, mode='max',
+                  indices=None):
+    """
+    Performs back propagation over a pooling layer.
+
+    Parameters:
+    - dA: np.ndarray of shape (m, out_h, out_w, c), gradient of the cost
+      with respect to the pooled images
+    - images_shape: tuple of (m, h, w, c), shape of the pooled input
+    - kernel_shape: tuple of (kh, kw)
+    - stride: tuple of (sh, sw)
+    - mode: 'max' or 'avg'
+    - indices: np.ndarray of shape (m, out_h, out_w, c), flat argmax
+      indices returned by pool(..., return_indices=True); required for
+      'max'
+
+    Returns:
+    - np.ndarray of shape (m, h, w, c), gradient with respect to the input
+    """
+    m, h, w, c = images_shape
+    kh, kw = kernel_shape
+    sh, sw = stride
+    out_h, out_w = dA.shape[1:3]
+
+    if mode == 'max':
+        if indices is None or indices.shape != dA.shape:
+            raise ValueError("max pooling needs the indices from pool")
+        # Scatter every gradient onto its argmax in one pass; windows that
+        # share a maximum accumulate through bincount
+        image = np.arange(m)[:, np.newaxis, np.newaxis, np.newaxis]
+        channel = np.arange(c)
+        target = (image * (h * w) + indices) * c + channel
+        dX = np.bincount(target.ravel(), weights=dA.ravel(),
+                         minlength=m * h * w * c)
+        return dX.reshape(m, h, w, c)
+
+    if mode == 'avg':
+        # Each tap of every window receives an equal share of its gradient
+        dX = np.zeros((m, h, w, c))
+        share = dA / (kh * kw)
+        for i in range(kh):
+            for j in range(kw):
+                dX[:, i:i + out_h * sh:sh, j:j + out_w * sw:sw, :] += share
+        return dX
+
+    raise ValueError("mode must be 'max' or 'avg'")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Module that processes image batches in memory-bounded chunks."""
+
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def batch_length(m, batch_size=None, max_memory=None, image_bytes=1):
+    """
+    Determines how many images to process at once.
+
+    Parameters:
+    - m: number of images in the batch
+    - batch_size: maximum number of images per chunk, or None
+    - max_memory: maximum working memory per chunk in bytes, or None
+    - image_bytes: estimated working memory needed for one image
+
+    Returns:
+    - the number of images per chunk, at least 1
+    """
+    length = m
+    if batch_size is not None:
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        length = min(length, batch_size)
+    if max_memory is not None:
+        if max_memory <= 0:
+            raise ValueError("max_memory must be positive")
+        length = min(length, int(max_memory // max(image_bytes, 1)))
+    return max(length, 1)
+
+
+def output_array(out, shape, dtype=float):
+    """
+    Prepares the array the chunked results are written into.
+
+    Parameters:
+    - out: None, a numpy.ndarray (a np.memmap works too) of the given
+      shape, or the path of a .npy file to create as a memory map
+    - shape: tuple, the shape of the full output
+    - dtype: data type of a newly created output
+
+    Returns:
+    - np.ndarray to write the output into
+    """
+    if out is None:
+        return np.zeros(shape, dtype=dtype)
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=dtype,
+                                         shape=shape)
+    if not isinstance(out, np.ndarray) or out.shape != shape:
+        raise ValueError("out must be a numpy.ndarray of shape {}".format(
+            shape))
+    return out
+
+
+def run_batches(func, images, out_shape, batch_size=None, max_memory=None,
+                image_bytes=1, out=None, workers=None, dtype=float):
+    """
+    Applies func to an image batch chunk by chunk along the image axis.
+
+    With several workers the chunks run on a thread pool; NumPy releases
+    the GIL inside its kernels, and every thread writes its own slice of
+    the preallocated output.
+
+    Parameters:
+    - func: callable mapping images of shape (k, ...) to results of shape
+      (k,) + out_shape, or to a tuple of such results
+    - images: np.ndarray of shape (m, ...), may be a np.memmap
+    - out_shape: tuple, the shape of the result for one image
+    - batch_size: maximum number of images per chunk, or None
+    - max_memory: maximum working memory in bytes shared by all the
+      chunks in flight, or None
+    - image_bytes: estimated working memory needed for one image
+    - out: where to write the results, see output_array; a tuple with
+      one entry per result when func returns a tuple
+    - workers: number of threads processing chunks concurrently, or None
+    - dtype: data type of a newly created output, or a tuple with one
+      data type per result when func returns a tuple
+
+    Returns:
+    - np.ndarray of shape (m,) + out_shape, or a tuple of them
+    """
+    m = images.shape[0]
+    if workers is None:
+        workers = 1
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError("workers must be a positive integer")
+    if max_memory is not None:
+        max_memory = max_memory / workers
+    length = batch_length(m, batch_size, max_memory, image_bytes)
+    length = max(min(length, -(-m // workers)), 1)
+    several = isinstance(dtype, tuple)
+    dtypes = dtype if several else (dtype,)
+    outs = out if several else (out,)
+    if outs is None:
+        outs = (None,) * len(dtypes)
+    if all(o is None for o in outs) and length >= m:
+        return func(images)
+
+    outs = [output_array(o, (m,) + tuple(out_shape), d)
+            for o, d in zip(outs, dtypes)]
+
+    def work(start):
+        """Computes the chunk starting at start into its output slices."""
+        results = func(images[start:start + length])
+        for o, result in zip(outs, results if several else (results,)):
+            o[start:start + length] = result
+
+    if workers == 1:
+        for start in range(0, m, length):
+            work(start)
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(work, range(0, m, length)))
+    return tuple(outs) if several else outs[0]
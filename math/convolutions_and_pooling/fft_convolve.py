@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Module that performs convolutions in the frequency domain."""
+
+
+import numpy as np
+is_box = __import__('summed_area').is_box
+BOX_MIN_TAPS = __import__('summed_area').BOX_MIN_TAPS
+
+# Relative cost of one FFT butterfly against one direct multiply-add,
+# used to decide when the frequency domain path is cheaper
+FFT_COST = 2
+
+
+def use_fft(method, image_shape, kernel, out_shape, dilation=(1, 1)):
+    """
+    Decides whether a convolution should run through the FFT path.
+
+    Box kernels are left to the direct path, which sums their windows
+    from a summed-area table.
+
+    Parameters:
+    - method: 'auto', 'direct' or 'fft'
+    - image_shape: tuple of (h, w) of the unpadded images
+    - kernel: np.ndarray of shape (kh, kw, ...)
+    - out_shape: tuple of (out_h, out_w)
+    - dilation: tuple of (dh, dw), the spacing between kernel taps
+
+    Returns:
+    - True if the FFT path should be used, False otherwise
+    """
+    if method not in ('auto', 'direct', 'fft'):
+        raise ValueError("method must be 'auto', 'direct' or 'fft'")
+    if method != 'auto':
+        return method == 'fft'
+
+    h, w = image_shape
+    kh, kw = kernel.shape[:2]
+    out_h, out_w = out_shape
+    if kh * kw >= BOX_MIN_TAPS and dilation == (1, 1) and is_box(kernel):
+        return False
+    size = (h + (kh - 1) * dilation[0] + 1) * (w + (kw - 1) * dilation[1] + 1)
+    direct = out_h * out_w * kh * kw
+    return direct > FFT_COST * size * np.log2(size)
+
+
+def fast_length(n):
+    """
+    Finds the smallest 5-smooth integer not less than n.
+
+    Parameters:
+    - n: positive integer, the minimum transform length
+
+    Returns:
+    - the transform length, a product of powers of 2, 3 and 5
+    """
+    best = 2 ** int(np.ceil(np.log2(n)))
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            p235 = p35
+            while p235 < n:
+                p235 *= 2
+            best = min(best, p235)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def fft_convolve(images, kernel, padding=(0, 0), stride=(1, 1),
+                 dilation=(1, 1), groups=1):
+    """
+    Performs a convolution with batched real FFTs over all the images.
+
+    The padding is never materialized: the images are transformed at a
+    size large enough for the circular convolution to contain the zeros
+    the padding would have introduced.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w, c)
+    - kernel: np.ndarray of shape (kh, kw, c) or (kh, kw, c, nc)
+    - padding: tuple of (ph, pw)
+    - stride: tuple of (sh, sw)
+    - dilation: tuple of (dh, dw), the spacing between kernel taps
+    - groups: number of channel groups, with a (kh, kw, c // groups, nc)
+      kernel
+
+    Returns:
+    - np.ndarray of shape (m, out_h, out_w), or (m, out_h, out_w, nc) for
+      a filter bank
+    """
+    m, h, w, c = images.shape
+    ph, pw = padding
+    sh, sw = stride
+
+    if dilation != (1, 1):
+        # The transform costs the same however sparse the kernel is
+        dh, dw = dilation
+        kh, kw = kernel.shape[:2]
+        spread = np.zeros(((kh - 1) * dh + 1, (kw - 1) * dw + 1) +
+                          kernel.shape[2:])
+        spread[::dh, ::dw] = kernel
+        kernel = spread
+    kh, kw = kernel.shape[:2]
+
+    out_h = (h + 2 * ph - kh) // sh + 1
+    out_w = (w + 2 * pw - kw) // sw + 1
+    fh = fast_length(h + kh - 1 + ph)
+    fw = fast_length(w + kw - 1 + pw)
+
+    spectrum = np.fft.rfft2(images, s=(fh, fw), axes=(1, 2))
+    kernel_spectrum = np.fft.rfft2(kernel[::-1, ::-1], s=(fh, fw),
+                                   axes=(0, 1))
+    if groups > 1:
+        cg, nc = kernel.shape[2:]
+        spectrum = spectrum.reshape(spectrum.shape[:3] + (groups, cg))
+        kernel_spectrum = kernel_spectrum.reshape(
+            kernel_spectrum.shape[:3] + (groups, nc // groups))
+        product = np.einsum('mhwgc,hwcgn->mhwgn', spectrum, kernel_spectrum)
+        product = product.reshape(product.shape[:3] + (nc,))
+    else:
+        product = np.einsum('mhwc,hwc...->mhw...', spectrum, kernel_spectrum)
+    full = np.fft.irfft2(product, s=(fh, fw), axes=(1, 2))
+
+    # Output pixel i reads the full convolution at i * sh - ph + kh - 1;
+    # negative positions wrap onto the zero tail of the transform
+    rows = (np.arange(out_h) * sh - ph + kh - 1) % fh
+    cols = (np.arange(out_w) * sw - pw + kw - 1) % fw
+    return full[:, rows[:, np.newaxis], cols]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Module that convolves with separable kernels as two 1D passes."""
+
+
+import numpy as np
+correlate = __import__('windows').correlate
+is_box = __import__('summed_area').is_box
+BOX_MIN_TAPS = __import__('summed_area').BOX_MIN_TAPS
+
+# Largest ratio of the second to the first singular value for which a
+# kernel is treated as rank-1
+SEPARABLE_RTOL = 1e-10
+
+
+def separate(kernel, separable=None):
+    """
+    Splits a kernel into a column and a row factor when it has rank 1.
+
+    Parameters:
+    - kernel: np.ndarray of shape (kh, kw) or (kh, kw, c), in which case
+      every channel is split on its own
+    - separable: None to split only when it pays off, True to require a
+      split, False to never split
+
+    Returns:
+    - (col, row) of shapes (kh,) and (kw,), or (kh, c) and (kw, c), such
+      that kernel[i, j] == col[i] * row[j]; None when the kernel is not
+      split
+    """
+    if separable is False or kernel.ndim not in (2, 3):
+        if separable:
+            raise ValueError("kernel is not separable")
+        return None
+    kh, kw = kernel.shape[:2]
+    if separable is None:
+        if kh == 1 or kw == 1:
+            return None
+        if kh * kw >= BOX_MIN_TAPS and is_box(kernel):
+            return None
+
+    # Singular values of every channel, channels first
+    stack = kernel.reshape(kh, kw, -1).transpose(2, 0, 1)
+    u, s, vt = np.linalg.svd(stack)
+    if s.shape[1] > 1 and np.any(s[:, 1] > SEPARABLE_RTOL * s[:, 0]):
+        if separable:
+            raise ValueError("kernel is not separable")
+        return None
+
+    root = np.sqrt(s[:, 0])
+    col = (u[:, :, 0] * root[:, np.newaxis]).T
+    row = (vt[:, 0, :] * root[:, np.newaxis]).T
+    if kernel.ndim == 2:
+        return col[:, 0], row[:, 0]
+    return col, row
+
+
+def separable_correlate(images, col, row, padding=(0, 0), stride=(1, 1),
+                        dilation=(1, 1)):
+    """
+    Convolves with the kernel col x row as a vertical then a horizontal
+    1D pass, costing kh + kw instead of kh * kw per output pixel.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w) or (m, h, w, c)
+    - col: np.ndarray of shape (kh,) or (kh, c), the column factor
+    - row: np.ndarray of shape (kw,) or (kw, c), the row factor
+    - padding: tuple of (ph, pw)
+    - stride: tuple of (sh, sw)
+    - dilation: tuple of (dh, dw), the spacing between kernel taps
+
+    Returns:
+    - np.ndarray of shape (m, out_h, out_w)
+    """
+    ph, pw = padding
+    sh, sw = stride
+    dh, dw = dilation
+    vertical = correlate(images, col[:, np.newaxis], (ph, 0), (sh, 1),
+                         depthwise=True, dilation=(dh, 1))
+    return correlate(vertical, row[np.newaxis], (0, pw), (1, sw),
+                     dilation=(1, dw))
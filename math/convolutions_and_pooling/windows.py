@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Module that builds zero-copy sliding window views over image batches."""
+
+
+import numpy as np
+is_box = __import__('summed_area').is_box
+box_sum = __import__('summed_area').box_sum
+BOX_MIN_TAPS = __import__('summed_area').BOX_MIN_TAPS
+
+
+def window_view(images, kernel_shape, stride=(1, 1), dilation=(1, 1)):
+    """
+    Creates a read-only view of every window of an image batch.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w, ...)
+    - kernel_shape: tuple of (kh, kw)
+    - stride: tuple of (sh, sw)
+    - dilation: tuple of (dh, dw), the spacing between kernel taps
+
+    Returns:
+    - np.ndarray view of shape (m, out_h, out_w, kh, kw, ...) sharing
+      memory with images
+    """
+    m, h, w = images.shape[:3]
+    kh, kw = kernel_shape
+    sh, sw = stride
+    dh, dw = dilation
+    out_h = max((h - (kh - 1) * dh - 1) // sh + 1, 0)
+    out_w = max((w - (kw - 1) * dw - 1) // sw + 1, 0)
+    s0, s1, s2 = images.strides[:3]
+
+    return np.lib.stride_tricks.as_strided(
+        images,
+        shape=(m, out_h, out_w, kh, kw) + images.shape[3:],
+        strides=(s0, s1 * sh, s2 * sw, s1 * dh, s2 * dw) + images.strides[3:],
+        writeable=False
+    )
+
+
+def _split(size, kernel, pad, stride, out):
+    """
+    Splits the output positions along one axis into the windows that
+    overlap the leading padding, the ones fully inside the image and the
+    ones overlapping the trailing padding.
+
+    Returns:
+    - list of (start, stop) output ranges, empty ranges removed
+    """
+    first = min(-(-pad // stride), out)
+    last = min(max((size - kernel + pad) // stride + 1, first), out)
+    return [(a, b) for a, b in ((0, first), (first, last), (last, out))
+            if a < b]
+
+
+def _slab(images, axis, start, stop):
+    """
+    Takes images[start:stop] along axis, padding with zeros only the part
+    of the range that falls outside the image.
+
+    Returns:
+    - np.ndarray, a view when the range lies inside the image
+    """
+    size = images.shape[axis]
+    lo = min(max(start, 0), size)
+    hi = max(min(stop, size), lo)
+    index = [slice(None)] * images.ndim
+    index[axis] = slice(lo, hi)
+    slab = images[tuple(index)]
+    before = min(max(-start, 0), stop - start)
+    after = stop - start - before - (hi - lo)
+    if before or after:
+        width = [(0, 0)] * images.ndim
+        width[axis] = (before, after)
+        slab = np.pad(slab, width, mode='constant')
+    return slab
+
+
+def padded_windows(images, kernel_shape, padding=(0, 0), stride=(1, 1),
+                   dilation=(1, 1)):
+    """
+    Yields window views of a zero padded image batch, block by block.
+
+    The padded batch is never built: windows lying inside the images are
+    views of the input, and only the thin strips of input next to a
+    padded border are copied with their zeros.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w, ...)
+    - kernel_shape: tuple of (kh, kw)
+    - padding: tuple of (ph, pw)
+    - stride: tuple of (sh, sw)
+    - dilation: tuple of (dh, dw), the spacing between kernel taps
+
+    Yields:
+    - rows: slice of output rows covered by the block
+    - cols: slice of output columns covered by the block
+    - windows: np.ndarray of shape (m, rows, cols, kh, kw, ...)
+    """
+    h, w = images.shape[1:3]
+    ph, pw = padding
+    sh, sw = stride
+    # Extent of a dilated window in the image
+    kh = (kernel_shape[0] - 1) * dilation[0] + 1
+    kw = (kernel_shape[1] - 1) * dilation[1] + 1
+    out_h = (h + 2 * ph - kh) // sh + 1
+    out_w = (w + 2 * pw - kw) // sw + 1
+
+    for r0, r1 in _split(h, kh, ph, sh, out_h):
+        band = _slab(images, 1, r0 * sh - ph, (r1 - 1) * sh - ph + kh)
+        for c0, c1 in _split(w, kw, pw, sw, out_w):
+            block = _slab(band, 2, c0 * sw - pw, (c1 - 1) * sw - pw + kw)
+            yield (slice(r0, r1), slice(c0, c1),
+                   window_view(block, kernel_shape, stride, dilation))
+
+
+def correlate(images, kernel, padding=(0, 0), stride=(1, 1),
+              depthwise=False, dilation=(1, 1), groups=1):
+    """
+    Slides a kernel over a zero padded image batch.
+
+    Each kernel tap is applied to a strided view of the batch and added
+    to the output, so memory stays close to the input plus the output.
+    Box kernels instead scale the window sums of a summed-area table.
+
+    Parameters:
+    - images: np.ndarray of shape (m, h, w) or (m, h, w, c)
+    - kernel: np.ndarray of shape (kh, kw), (kh, kw, c) or (kh, kw, c, nc)
+      for a bank of nc filters
+    - padding: tuple of (ph, pw)
+    - stride: tuple of (sh, sw)
+    - depthwise: if True, a (kh, kw, c) kernel filters every channel on
+      its own instead of summing over the channels
+    - dilation: tuple of (dh, dw), the spacing between kernel taps
+    - groups: number of channel groups; a (kh, kw, c // groups, nc)
+      kernel maps every group of input channels to nc // groups outputs
+
+    Returns:
+    - np.ndarray of shape (m, out_h, out_w), (m, out_h, out_w, nc) for a
+      filter bank, or (m, out_h, out_w, c) for a depthwise convolution
+    """
+    m, h, w = images.shape[:3]
+    kh, kw = kernel.shape[:2]
+    ph, pw = padding
+    sh, sw = stride
+    dh, dw = dilation
+    scale = kernel.ndim == 2 or depthwise
+
+    if (kh * kw >= BOX_MIN_TAPS and dilation == (1, 1) and groups == 1
+            and is_box(kernel)):
+        sums = box_sum(images, (kh, kw), padding, stride)
+        if scale:
+            return sums * kernel[0, 0]
+        return sums @ kernel[0, 0]
+
+    out_h = (h + 2 * ph - (kh - 1) * dh - 1) // sh + 1
+    out_w = (w + 2 * pw - (kw - 1) * dw - 1) // sw + 1
+    extra = kernel.shape[2:] if depthwise else kernel.shape[3:]
+    output = np.zeros((m, out_h, out_w) + extra)
+    if groups > 1:
+        # (kh, kw, groups, c // groups, nc // groups) weights per group
+        cg, nc = kernel.shape[2:]
+        kernel = kernel.reshape(kh, kw, cg, groups, nc // groups)
+        kernel = kernel.transpose(0, 1, 3, 2, 4)
+
+    for rows, cols, windows in padded_windows(images, (kh, kw), padding,
+                                              stride, dilation):
+        block = output[:, rows, cols]
+        for i in range(kh):
+            for j in range(kw):
+                tap = windows[:, :, :, i, j]
+                if scale:
+                    block += tap * kernel[i, j]
+                elif groups > 1:
+                    tap = tap.reshape(tap.shape[:3] + (groups, 1, -1))
+                    block += (tap @ kernel[i, j]).reshape(block.shape)
+                else:
+                    block += tap @ kernel[i, j]
+
+    return output
@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 """Module for K-means clustering algorithm."""
 import numpy as np
+nearest = __import__('distances').nearest
 
 
-def kmeans(X, k, iterations=1000):
+def kmeans(X, k, iterations=1000, max_memory=None):
     """Perform K-means clustering on a dataset.
 
     Args:
         X: numpy.ndarray of shape (n, d) containing the dataset
         k: positive integer, number of clusters
         iterations: positive integer, maximum number of iterations
+        max_memory: approximate working memory in bytes for the distance
+            computation, or None for the default budget
 
     Returns:
         C: numpy.ndarray of shape (k, d) with centroid means per cluster
@@ -27,10 +30,10 @@ def kmeans(X, k, iterations=1000):
     low = X.min(axis=0)
     high = X.max(axis=0)
     C = np.random.uniform(low, high, (k, d))
+    X_sq = np.einsum('ij,ij->i', X, X)
 
     for _ in range(iterations):
-        dists = np.linalg.norm(X[:, np.newaxis] - C, axis=2)
-        clss = np.argmin(dists, axis=1)
+        clss, _ = nearest(X, C, X_sq, max_memory)
         C_new = np.array([
             X[clss == i].mean(axis=0) if np.any(clss == i)
             else np.random.uniform(low, high)
@@ -40,6 +43,5 @@ def kmeans(X, k, iterations=1000):
             return C_new, clss
         C = C_new
 
-    dists = np.linalg.norm(X[:, np.newaxis] - C, axis=2)
-    clss = np.argmin(dists, axis=1)
+    clss, _ = nearest(X, C, X_sq, max_memory)
     return C, clss
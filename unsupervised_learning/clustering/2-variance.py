@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 """Module for calculating total intra-cluster variance."""
 import numpy as np
+nearest = __import__('distances').nearest
 
 
-def variance(X, C):
+def variance(X, C, max_memory=None):
     """Calculate the total intra-cluster variance for a dataset.
 
     Args:
         X: numpy.ndarray of shape (n, d) containing the dataset
         C: numpy.ndarray of shape (k, d) containing centroid means
+        max_memory: approximate working memory in bytes for the distance
+            computation, or None for the default budget
 
     Returns:
         var: total variance, or None on failure
@@ -19,6 +22,5 @@ def variance(X, C):
         return None
     if X.shape[1] != C.shape[1]:
         return None
-    dists = np.linalg.norm(X[:, np.newaxis] - C, axis=2)
-    clss = np.argmin(dists, axis=1)
-    return np.sum((X - C[clss]) ** 2)
+    _, dist_sq = nearest(X, C, max_memory=max_memory)
+    return np.sum(dist_sq)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Module for assigning data points to their nearest centroid."""
+import numpy as np
+
+# Default working memory budget in bytes for the distance blocks
+MAX_MEMORY = 2 ** 28
+
+
+def nearest(X, C, X_sq=None, max_memory=None):
+    """Find the nearest centroid of every data point.
+
+    Squared distances are expanded as ||x||^2 - 2 x.c + ||c||^2, so every
+    block of rows costs one matrix product and no (n, k, d) difference
+    array is built.
+
+    Args:
+        X: numpy.ndarray of shape (n, d) containing the dataset
+        C: numpy.ndarray of shape (k, d) containing centroid means
+        X_sq: numpy.ndarray of shape (n,) with the squared norms of the
+            rows of X, computed here if None; pass it in to reuse it
+            across iterations
+        max_memory: approximate size in bytes of the (rows, k) distance
+            block computed at once, MAX_MEMORY if None
+
+    Returns:
+        clss: numpy.ndarray of shape (n,) with cluster index per data point
+        dist_sq: numpy.ndarray of shape (n,) with the squared distance of
+            every data point to its centroid
+    """
+    n = X.shape[0]
+    k = C.shape[0]
+    if X_sq is None:
+        X_sq = np.einsum('ij,ij->i', X, X)
+    C_sq = np.einsum('ij,ij->i', C, C)
+    rows = max((max_memory or MAX_MEMORY) // (8 * k), 1)
+
+    clss = np.empty(n, dtype=int)
+    dist_sq = np.empty(n)
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        block = X[start:stop] @ C.T
+        block *= -2
+        block += C_sq
+        clss[start:stop] = np.argmin(block, axis=1)
+        # ||x||^2 is the same for every centroid, so it is only added to
+        # the minimum; rounding can leave tiny negative values
+        best = block[np.arange(stop - start), clss[start:stop]]
+        dist_sq[start:stop] = np.maximum(best + X_sq[start:stop], 0)
+    return clss, dist_sq
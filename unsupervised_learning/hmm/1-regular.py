@@ -1,36 +1,102 @@
 #!/usr/bin/env python3
 """Module for steady state probabilities of a regular Markov chain."""
+import warnings
 import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, gmres, spsolve
+transition_graph = __import__('chain_graph').transition_graph
+is_regular = __import__('chain_graph').is_regular
 
 
-def regular(P):
+def stationary(P, method='gmres', pi0=None, tol=1e-10, max_iter=1000):
+    """Solve iteratively for the stationary distribution of a regular chain.
+
+    Args:
+        P: numpy.ndarray or scipy.sparse matrix of shape (n, n), the
+            transition matrix of a regular Markov chain
+        method: 'power' to iterate pi = pi @ P, or 'gmres' to solve
+            (I - P + 1 u^T)^T pi = u with u = pi0, which is nonsingular
+            for any u summing to 1
+        pi0: numpy.ndarray of shape (n,), the starting guess, e.g. the
+            solution before a small edit of P; uniform if None
+        tol: 'power' stops once the L1 change of pi is below tol, 'gmres'
+            once the residual is below tol relative to u
+        max_iter: largest number of iterations ('gmres' restart cycles)
+
+    Returns:
+        numpy.ndarray of shape (n,) with the stationary distribution, or
+        None if it did not converge within max_iter iterations
+    """
+    n = P.shape[0]
+    pi = np.full(n, 1 / n) if pi0 is None else pi0 / np.sum(pi0)
+    PT = P.T.tocsr() if sparse.issparse(P) else P.T
+
+    if method == 'power':
+        for _ in range(max_iter):
+            nxt = PT @ pi
+            if np.sum(np.abs(nxt - pi)) < tol:
+                return nxt / np.sum(nxt)
+            pi = nxt
+        return None
+
+    if method == 'gmres':
+        u = pi.copy()
+        A = LinearOperator((n, n), dtype=float,
+                           matvec=lambda x: x - PT @ x + u * np.sum(x))
+        pi, info = gmres(A, u, x0=pi, rtol=tol, maxiter=max_iter)
+        if info != 0:
+            return None
+        return pi / np.sum(pi)
+
+    raise ValueError("method must be 'power' or 'gmres'")
+
+
+def regular(P, method='auto', pi0=None, tol=1e-10, max_iter=1000):
     """Determine the steady state probabilities of a regular Markov chain.
 
     Args:
-        P: numpy.ndarray of shape (n, n), the transition matrix
+        P: numpy.ndarray or scipy.sparse matrix of shape (n, n), the
+            transition matrix
+        method: 'direct' (or 'auto') to solve the linear system exactly,
+            or 'power' or 'gmres' to use stationary; an iterative method
+            that does not converge warns and falls back to 'direct'
+        pi0: numpy.ndarray of shape (1, n) or (n,), the starting guess of
+            an iterative method, e.g. the result before a small edit of P
+        tol: tolerance of an iterative method
+        max_iter: iteration cap of an iterative method
 
     Returns:
         numpy.ndarray of shape (1, n) with steady state probabilities,
         or None on failure
     """
-    if not isinstance(P, np.ndarray) or P.ndim != 2:
+    graph = transition_graph(P)
+    if graph is None or not is_regular(graph):
         return None
-    if P.shape[0] != P.shape[1]:
-        return None
-    if not np.isclose(P.sum(axis=1), 1).all():
+    if method not in ('auto', 'direct', 'power', 'gmres'):
         return None
     n = P.shape[0]
 
-    # Check regularity: some power of P must have all positive entries
-    Pk = P.copy()
-    regular = False
-    for _ in range(n * n):
-        if (Pk > 0).all():
-            regular = True
-            break
-        Pk = Pk @ P
-    if not regular:
-        return None
+    if method in ('power', 'gmres'):
+        if pi0 is not None:
+            if not isinstance(pi0, np.ndarray) or pi0.size != n:
+                return None
+            pi0 = pi0.reshape(n)
+        pi = stationary(P, method, pi0, tol, max_iter)
+        if pi is not None:
+            return pi.reshape(1, n)
+        # The chain is regular, only the iteration failed to converge
+        warnings.warn("{} did not converge within {} iterations, solving"
+                      " directly".format(method, max_iter), RuntimeWarning)
+
+    if sparse.issparse(P):
+        # pi @ (P - I) = 0 has rank n - 1 for a regular chain, so one of
+        # its equations is replaced by the normalization constraint
+        A = sparse.lil_matrix((P - sparse.eye(n)).T)
+        A[n - 1] = np.ones(n)
+        b = np.zeros(n)
+        b[-1] = 1
+        pi = spsolve(sparse.csc_matrix(A), b)
+        return pi.reshape(1, n)
 
     # used sum(pi) = 1 using linear algebra
     # pi @ (P - I) = 0, add normalization constraint
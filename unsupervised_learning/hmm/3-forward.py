@@ -1,27 +1,35 @@
 #!/usr/bin/env python3
 """Module for the forward algorithm for a hidden Markov model."""
 import numpy as np
+from scipy import sparse
 
 
-def forward(Observation, Emission, Transition, Initial):
+def forward(Observation, Emission, Transition, Initial, scaled=False):
     """Perform the forward algorithm for a hidden Markov model.
 
     Args:
         Observation: numpy.ndarray of shape (T,) with observation indices
         Emission: numpy.ndarray of shape (N, M) with emission probabilities
-        Transition: numpy.ndarray of shape (N, N) with transition probabilities
+        Transition: numpy.ndarray or scipy.sparse matrix of shape (N, N) with
+            transition probabilities
         Initial: numpy.ndarray of shape (N, 1) with initial state probabilities
+        scaled: if True, normalize F at every step so long sequences do not
+            underflow, and return the log-likelihood instead of P
 
     Returns:
-        P: likelihood of the observations given the model
-        F: numpy.ndarray of shape (N, T) with forward path probabilities
+        P: likelihood of the observations given the model, or its log if
+            scaled
+        F: numpy.ndarray of shape (N, T) with forward path probabilities,
+            or with the filtered state probabilities P(state | obs[:t+1])
+            if scaled
         or None, None on failure
     """
     if not isinstance(Observation, np.ndarray) or Observation.ndim != 1:
         return None, None
     if not isinstance(Emission, np.ndarray) or Emission.ndim != 2:
         return None, None
-    if not isinstance(Transition, np.ndarray) or Transition.ndim != 2:
+    if not (isinstance(Transition, np.ndarray) or
+            sparse.issparse(Transition)) or Transition.ndim != 2:
         return None, None
     if not isinstance(Initial, np.ndarray) or Initial.ndim != 2:
         return None, None
@@ -33,10 +41,24 @@ def forward(Observation, Emission, Transition, Initial):
         return None, None
     if Initial.shape != (N, 1):
         return None, None
+    if sparse.issparse(Transition):
+        Transition = sparse.csr_matrix(Transition)
 
     F = np.zeros((N, T))
     F[:, 0] = Initial[:, 0] * Emission[:, Observation[0]]
 
+    if scaled:
+        # c[t] = P(obs[t] | obs[:t]), so the log-likelihood is sum(log c)
+        c = np.zeros(T)
+        c[0] = np.sum(F[:, 0])
+        F[:, 0] /= c[0]
+        for t in range(1, T):
+            F[:, t] = (F[:, t - 1] @ Transition) * Emission[
+                :, Observation[t]]
+            c[t] = np.sum(F[:, t])
+            F[:, t] /= c[t]
+        return np.sum(np.log(c)), F
+
     for t in range(1, T):
         F[:, t] = (F[:, t - 1] @ Transition) * Emission[:, Observation[t]]
 
@@ -1,6 +1,76 @@
 #!/usr/bin/env python3
 """Module for the Viterbi algorithm for a hidden Markov model."""
 import numpy as np
+from scipy import sparse
+batch_observations = __import__('observations').batch_observations
+
+
+def incoming(Transition, log=False):
+    """Prepare a transition matrix for repeated max-product steps.
+
+    Args:
+        Transition: numpy.ndarray or scipy.sparse matrix of shape (N, N)
+            with transition probabilities
+        log: if True, the weights are the logs of the probabilities
+
+    Returns:
+        the dense weight matrix, or for a sparse Transition a tuple of the
+        CSC matrix of weights, its non-empty columns, the offset of each
+        of their first entries, and the column slot of every entry
+    """
+    if not sparse.issparse(Transition):
+        if log:
+            with np.errstate(divide='ignore'):
+                return np.log(Transition)
+        return Transition
+    csc = sparse.csc_matrix(Transition, dtype=float, copy=True)
+    csc.sum_duplicates()
+    if log:
+        with np.errstate(divide='ignore'):
+            csc.data = np.log(csc.data)
+    counts = np.diff(csc.indptr)
+    cols = np.flatnonzero(counts)
+    slots = np.repeat(np.arange(cols.shape[0]), counts[cols])
+    return csc, cols, csc.indptr[cols], slots
+
+
+def max_product(V, weights, log=False):
+    """Find the best predecessor of every state.
+
+    Args:
+        V: numpy.ndarray of shape (..., N) with the path scores so far
+        weights: transition weights returned by incoming
+        log: if True, scores are added to the weights instead of multiplied
+
+    Returns:
+        best: numpy.ndarray of shape (..., N) with the best score reaching
+            every state
+        argbest: numpy.ndarray of shape (..., N) with the state it comes from
+    """
+    if isinstance(weights, np.ndarray):
+        scores = V[..., np.newaxis] + weights if log else \
+            V[..., np.newaxis] * weights
+        return np.max(scores, axis=-2), np.argmax(scores, axis=-2)
+
+    # Only the stored entries of every column are compared, so a step costs
+    # O(nnz) instead of O(N^2)
+    csc, cols, starts, slots = weights
+    empty = -np.inf if log else 0
+    best = np.full(V.shape, empty, dtype=float)
+    argbest = np.zeros(V.shape, dtype=int)
+    if cols.shape[0] == 0:
+        return best, argbest
+    scores = V[..., csc.indices] + csc.data if log else \
+        V[..., csc.indices] * csc.data
+    top = np.maximum.reduceat(scores, starts, axis=-1)
+    # First stored entry of every column reaching its maximum, which is the
+    # lowest row like np.argmax on the dense matrix
+    entry = np.where(scores == top[..., slots], np.arange(csc.nnz),
+                     csc.nnz)
+    first = np.minimum.reduceat(entry, starts, axis=-1)
+    best[..., cols] = top
+    argbest[..., cols] = csc.indices[np.minimum(first, csc.nnz - 1)]
+    return best, argbest
 
 
 def viterbi(Observation, Emission, Transition, Initial):
@@ -9,7 +79,8 @@ def viterbi(Observation, Emission, Transition, Initial):
     Args:
         Observation: numpy.ndarray of shape (T,) with observation indices
         Emission: numpy.ndarray of shape (N, M) with emission probabilities
-        Transition: numpy.ndarray of shape (N, N) with transition probabilities
+        Transition: numpy.ndarray or scipy.sparse matrix of shape (N, N) with
+            transition probabilities
         Initial: numpy.ndarray of shape (N, 1) with initial state probabilities
 
     Returns:
@@ -21,7 +92,8 @@ def viterbi(Observation, Emission, Transition, Initial):
         return None, None
     if not isinstance(Emission, np.ndarray) or Emission.ndim != 2:
         return None, None
-    if not isinstance(Transition, np.ndarray) or Transition.ndim != 2:
+    if not (isinstance(Transition, np.ndarray) or
+            sparse.issparse(Transition)) or Transition.ndim != 2:
         return None, None
     if not isinstance(Initial, np.ndarray) or Initial.ndim != 2:
         return None, None
@@ -39,10 +111,10 @@ def viterbi(Observation, Emission, Transition, Initial):
 
     V[:, 0] = Initial[:, 0] * Emission[:, Observation[0]]
 
+    weights = incoming(Transition)
     for t in range(1, T):
-        trans_prob = V[:, t - 1, np.newaxis] * Transition
-        B[:, t] = np.argmax(trans_prob, axis=0)
-        V[:, t] = np.max(trans_prob, axis=0) * Emission[:, Observation[t]]
+        trans_prob, B[:, t] = max_product(V[:, t - 1], weights)
+        V[:, t] = trans_prob * Emission[:, Observation[t]]
 
     path = [np.argmax(V[:, T - 1])]
     for t in range(T - 1, 0, -1):
@@ -51,3 +123,71 @@ def viterbi(Observation, Emission, Transition, Initial):
 
     P = np.max(V[:, T - 1])
     return path, P
+
+
+def viterbi_batch(Observations, Emission, Transition, Initial, lengths=None):
+    """Decode the most likely hidden states of many sequences in log space.
+
+    Args:
+        Observations: numpy.ndarray of shape (T,) with observation indices,
+            a list of such arrays, or a padded numpy.ndarray of shape (S, T)
+        Emission: numpy.ndarray of shape (N, M) with emission probabilities
+        Transition: numpy.ndarray or scipy.sparse matrix of shape (N, N) with
+            transition probabilities
+        Initial: numpy.ndarray of shape (N, 1) with initial state probabilities
+        lengths: numpy.ndarray of shape (S,) with the length of every row
+            of a padded Observations array, or None if all rows are full
+
+    Returns:
+        paths: numpy.ndarray of shape (S, T) and dtype int32 with the most
+            likely state sequences, -1 past the end of a sequence
+        log_P: numpy.ndarray of shape (S,) with the log-probability of
+            every path
+        or None, None on failure
+    """
+    obs, lengths = batch_observations(Observations, lengths)
+    if obs is None:
+        return None, None
+    if not isinstance(Emission, np.ndarray) or Emission.ndim != 2:
+        return None, None
+    if not (isinstance(Transition, np.ndarray) or
+            sparse.issparse(Transition)) or Transition.ndim != 2:
+        return None, None
+    if not isinstance(Initial, np.ndarray) or Initial.ndim != 2:
+        return None, None
+
+    S, T = obs.shape
+    N, M = Emission.shape
+
+    if Transition.shape != (N, N):
+        return None, None
+    if Initial.shape != (N, 1):
+        return None, None
+    if np.any(obs >= M):
+        return None, None
+
+    with np.errstate(divide='ignore'):
+        log_E = np.log(Emission.T)
+        log_I = np.log(Initial[:, 0])
+    log_T = incoming(Transition, log=True)
+    active = np.arange(T) < lengths[:, np.newaxis]
+
+    # Past the end of a sequence V is frozen and the back pointers are the
+    # identity, so the backtrace below starts at every sequence's last step
+    V = log_I + log_E[obs[:, 0]]
+    B = np.empty((S, T, N), dtype=np.int32)
+    B[:, 0] = np.arange(N)
+    for t in range(1, T):
+        V_next, B[:, t] = max_product(V, log_T, log=True)
+        V_next += log_E[obs[:, t]]
+        V = np.where(active[:, t, np.newaxis], V_next, V)
+        B[:, t][~active[:, t]] = np.arange(N)
+
+    paths = np.empty((S, T), dtype=np.int32)
+    paths[:, T - 1] = np.argmax(V, axis=1)
+    rows = np.arange(S)
+    for t in range(T - 1, 0, -1):
+        paths[:, t - 1] = B[rows, t, paths[:, t]]
+    paths[~active] = -1
+
+    return paths, np.max(V, axis=1)
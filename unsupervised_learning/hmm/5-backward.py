@@ -1,27 +1,34 @@
 #!/usr/bin/env python3
 """Module for the backward algorithm for a hidden Markov model."""
 import numpy as np
+from scipy import sparse
 
 
-def backward(Observation, Emission, Transition, Initial):
+def backward(Observation, Emission, Transition, Initial, scaled=False):
     """Perform the backward algorithm for a hidden Markov model.
 
     Args:
         Observation: numpy.ndarray of shape (T,) with observation indices
         Emission: numpy.ndarray of shape (N, M) with emission probabilities
-        Transition: numpy.ndarray of shape (N, N) with transition probabilities
+        Transition: numpy.ndarray or scipy.sparse matrix of shape (N, N) with
+            transition probabilities
         Initial: numpy.ndarray of shape (N, 1) with initial state probabilities
+        scaled: if True, normalize B at every step so long sequences do not
+            underflow, and return the log-likelihood instead of P
 
     Returns:
-        P: likelihood of the observations given the model
-        B: numpy.ndarray of shape (N, T) with backward path probabilities
+        P: likelihood of the observations given the model, or its log if
+            scaled
+        B: numpy.ndarray of shape (N, T) with backward path probabilities,
+            each column rescaled to sum to 1 if scaled
         or None, None on failure
     """
     if not isinstance(Observation, np.ndarray) or Observation.ndim != 1:
         return None, None
     if not isinstance(Emission, np.ndarray) or Emission.ndim != 2:
         return None, None
-    if not isinstance(Transition, np.ndarray) or Transition.ndim != 2:
+    if not (isinstance(Transition, np.ndarray) or
+            sparse.issparse(Transition)) or Transition.ndim != 2:
         return None, None
     if not isinstance(Initial, np.ndarray) or Initial.ndim != 2:
         return None, None
@@ -33,15 +40,29 @@ def backward(Observation, Emission, Transition, Initial):
         return None, None
     if Initial.shape != (N, 1):
         return None, None
+    if sparse.issparse(Transition):
+        Transition = sparse.csr_matrix(Transition)
 
     B = np.zeros((N, T))
     B[:, T - 1] = 1
 
+    if scaled:
+        # Every column is divided by its sum d[t]; the likelihood is
+        # recovered as prod(d) * P computed from the rescaled B[:, 0]
+        B[:, T - 1] /= N
+        log_d = np.log(N)
+        for t in range(T - 2, -1, -1):
+            B[:, t] = Transition @ (Emission[:, Observation[t + 1]] *
+                                    B[:, t + 1])
+            d = np.sum(B[:, t])
+            B[:, t] /= d
+            log_d += np.log(d)
+        P = np.sum(Initial[:, 0] * Emission[:, Observation[0]] * B[:, 0])
+        return np.log(P) + log_d, B
+
     for t in range(T - 2, -1, -1):
-        B[:, t] = np.sum(
-            Transition * Emission[:, Observation[t + 1]] * B[:, t + 1],
-            axis=1
-        )
+        B[:, t] = Transition @ (Emission[:, Observation[t + 1]] *
+                                B[:, t + 1])
 
     P = np.sum(Initial[:, 0] * Emission[:, Observation[0]] * B[:, 0])
     return P, B
@@ -1,86 +1,458 @@
 #!/usr/bin/env python3
 """Module for the Baum-Welch algorithm for a hidden Markov model."""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import time
 import numpy as np
+from scipy import sparse
+batch_observations = __import__('observations').batch_observations
+emissions = __import__('observations').emissions
 
+# Number of (step, stored entry) products summed at once for a sparse
+# Transition
+SPARSE_CHUNK = 2 ** 20
 
-def baum_welch(Observations, Transition, Emission, Initial, iterations=1000):
+
+def forward_backward(emit, Transition, Initial):
+    """Run the scaled forward and backward passes over a batch of sequences.
+
+    Args:
+        emit: numpy.ndarray of shape (S, T, M) from emissions
+        Transition: numpy.ndarray or CSR matrix of shape (M, M) with
+            transition probabilities
+        Initial: numpy.ndarray of shape (M, 1) with initial state probabilities
+
+    Returns:
+        F: numpy.ndarray of shape (S, T, M) with forward probabilities, each
+            step scaled to sum to 1
+        B: numpy.ndarray of shape (S, T, M) with backward probabilities
+            scaled by the same factors
+        c: numpy.ndarray of shape (S, T) with the scaling factors; their
+            logs sum to the log-likelihood of every sequence
+    """
+    S, T, M = emit.shape
+
+    F = np.zeros((S, T, M))
+    c = np.zeros((S, T))
+    F[:, 0] = Initial[:, 0] * emit[:, 0]
+    c[:, 0] = np.sum(F[:, 0], axis=1)
+    F[:, 0] /= c[:, 0, np.newaxis]
+    for t in range(1, T):
+        F[:, t] = (F[:, t - 1] @ Transition) * emit[:, t]
+        c[:, t] = np.sum(F[:, t], axis=1)
+        F[:, t] /= c[:, t, np.newaxis]
+
+    # Past the end of a sequence emit and c are 1, which keeps B at 1
+    B = np.ones((S, T, M))
+    for t in range(T - 2, -1, -1):
+        B[:, t] = ((emit[:, t + 1] * B[:, t + 1]) @
+                   Transition.T) / c[:, t + 1, np.newaxis]
+
+    return F, B, c
+
+
+def transition_counts(F, W, Transition):
+    """Sum the expected transitions F[t, i] * Transition[i, j] * W[t, j].
+
+    Args:
+        F: numpy.ndarray of shape (K, M) with the forward probabilities
+        W: numpy.ndarray of shape (K, M) with the weighted backward
+            probabilities of the following steps
+        Transition: numpy.ndarray or CSR matrix of shape (M, M) with
+            transition probabilities
+
+    Returns:
+        numpy.ndarray of shape (M, M) with the counts summed over the K
+        steps, or of shape (nnz,) with the counts of the stored entries of
+        a CSR Transition, whose other entries always stay 0
+    """
+    if not sparse.issparse(Transition):
+        return Transition * (F.T @ W)
+    rows = np.repeat(np.arange(Transition.shape[0]),
+                     np.diff(Transition.indptr))
+    cols = Transition.indices
+    counts = np.zeros(Transition.nnz)
+    chunk = max(SPARSE_CHUNK // max(Transition.nnz, 1), 1)
+    for start in range(0, F.shape[0], chunk):
+        counts += np.einsum('ki,ki->i', F[start:start + chunk, rows],
+                            W[start:start + chunk, cols])
+    return Transition.data * counts
+
+
+def expected_counts(obs, lengths, Transition, Emission, Initial):
+    """Compute the E-step sufficient statistics of a batch of sequences.
+
+    Args:
+        obs: numpy.ndarray of shape (S, T) with padded observation indices
+        lengths: numpy.ndarray of shape (S,) with the sequence lengths
+        Transition: numpy.ndarray or CSR matrix of shape (M, M) with
+            transition probabilities
+        Emission: numpy.ndarray of shape (M, N) with emission probabilities
+        Initial: numpy.ndarray of shape (M, 1) with initial state probabilities
+
+    Returns:
+        xi_sum: expected transition counts, as returned by
+            transition_counts
+        emission_counts: numpy.ndarray of shape (M, N) with expected emission
+            counts
+        gamma_sum: numpy.ndarray of shape (M,) with expected state visits
+        gamma_last: numpy.ndarray of shape (M,) with expected visits at the
+            last step of every sequence
+        log_likelihood: log-likelihood of all the sequences
+    """
+    S, T = obs.shape
+    M = Transition.shape[0]
+    N = Emission.shape[1]
+    active = np.arange(T) < lengths[:, np.newaxis]
+
+    emit = emissions(obs, lengths, Emission)
+    F, B, c = forward_backward(emit, Transition, Initial)
+
+    # Expected transition counts, pooled over sequences and time:
+    # xi[s, t, i, j] = F[s, t, i] * Transition[i, j] * W[s, t + 1, j]
+    # normalized over (i, j), reduced to (M, M) by a single product
+    W = emit[:, 1:] * B[:, 1:]
+    WT = (W.reshape(-1, M) @ Transition.T).reshape(W.shape)
+    denom = np.einsum('sti,sti->st', F[:, :-1], WT)
+    W *= (active[:, 1:] / denom)[:, :, np.newaxis]
+    xi_sum = transition_counts(F[:, :-1].reshape(-1, M), W.reshape(-1, M),
+                               Transition)
+
+    # Gamma: (S, T, M) - probability of being in state i at time t
+    gamma = F * B
+    gamma /= np.sum(gamma, axis=2, keepdims=True)
+    gamma[~active] = 0
+
+    # Emission counts, scattering gamma onto the observed symbols
+    emission_counts = np.zeros((N, M))
+    np.add.at(emission_counts, obs[active], gamma[active])
+
+    return (xi_sum, emission_counts.T, np.sum(gamma, axis=(0, 1)),
+            np.sum(gamma[np.arange(S), lengths - 1], axis=0),
+            np.sum(np.log(c)))
+
+
+def checkpointed_counts(obs, lengths, Transition, Emission, Initial,
+                        segment=None):
+    """Compute the E-step sufficient statistics in O(sqrt(T)) memory.
+
+    The forward pass only keeps its state at the start of every segment of
+    segment steps. The backward sweep then recomputes one segment of
+    forward states at a time and accumulates the counts step by step, so
+    neither the full forward and backward matrices nor xi are ever stored.
+
+    Args:
+        obs: numpy.ndarray of shape (S, T) with padded observation indices
+        lengths: numpy.ndarray of shape (S,) with the sequence lengths
+        Transition: numpy.ndarray or CSR matrix of shape (M, M) with
+            transition probabilities
+        Emission: numpy.ndarray of shape (M, N) with emission probabilities
+        Initial: numpy.ndarray of shape (M, 1) with initial state probabilities
+        segment: number of steps between checkpoints, ceil(sqrt(T)) if None
+
+    Returns:
+        the same statistics as expected_counts
+    """
+    S, T = obs.shape
+    M = Transition.shape[0]
+    N = Emission.shape[1]
+    L = segment or int(np.ceil(np.sqrt(T)))
+    active = np.arange(T) < lengths[:, np.newaxis]
+    ET = Emission.T
+
+    def emit(t):
+        """Emission probabilities of step t, 1 past the end of a sequence."""
+        return np.where(active[:, t, np.newaxis], ET[obs[:, t]], 1)
+
+    def advance(F, t):
+        """Move the scaled forward state from step t - 1 to step t."""
+        F = F @ Transition if t else Initial[:, 0] * np.ones((S, 1))
+        F = F * emit(t)
+        c = np.sum(F, axis=1)
+        return F / c[:, np.newaxis], c
+
+    # Forward sweep, keeping only the state at every checkpoint
+    starts = range(0, T, L)
+    checkpoints = np.zeros((len(starts), S, M))
+    scales = np.zeros((len(starts), S))
+    log_likelihood = 0.0
+    F = None
+    for t in range(T):
+        F, c = advance(F, t)
+        log_likelihood += np.sum(np.log(c))
+        if t % L == 0:
+            checkpoints[t // L] = F
+            scales[t // L] = c
+
+    xi_sum = transition_counts(np.zeros((0, M)), np.zeros((0, M)), Transition)
+    emission_counts = np.zeros((N, M))
+    gamma_sum = np.zeros(M)
+    gamma_last = np.zeros(M)
+    B = np.ones((S, M))
+    W = c_next = None
+    for k in range(len(starts) - 1, -1, -1):
+        # Recompute the forward states and scaling factors of the segment
+        first, stop = starts[k], min(starts[k] + L, T)
+        F_seg = np.zeros((S, stop - first, M))
+        c_seg = np.zeros((S, stop - first))
+        F_seg[:, 0] = checkpoints[k]
+        c_seg[:, 0] = scales[k]
+        for t in range(first + 1, stop):
+            F_seg[:, t - first], c_seg[:, t - first] = advance(
+                F_seg[:, t - first - 1], t)
+
+        gamma = np.zeros((S, stop - first, M))
+        for t in range(stop - 1, first - 1, -1):
+            F = F_seg[:, t - first]
+            if W is not None:
+                # The xi reduction of expected_counts for step t alone
+                WT = W @ Transition.T
+                denom = np.sum(F * WT, axis=1)
+                weight = (active[:, t + 1] / denom)[:, np.newaxis]
+                xi_sum += transition_counts(F * weight, W, Transition)
+                B = WT / c_next[:, np.newaxis]
+            gamma[:, t - first] = F * B
+            c_next = c_seg[:, t - first]
+            W = emit(t) * B
+        gamma /= np.sum(gamma, axis=2, keepdims=True)
+
+        seg_active = active[:, first:stop]
+        gamma[~seg_active] = 0
+        np.add.at(emission_counts, obs[:, first:stop][seg_active],
+                  gamma[seg_active])
+        gamma_sum += np.sum(gamma, axis=(0, 1))
+        last = lengths - 1 - first
+        ends = (last >= 0) & (last < stop - first)
+        gamma_last += np.sum(gamma[ends, last[ends]], axis=0)
+
+    return (xi_sum, emission_counts.T, gamma_sum, gamma_last,
+            log_likelihood)
+
+
+def model_views(buffer, M, N, pattern=None):
+    """Lay the model matrices out over one flat shared buffer.
+
+    Args:
+        buffer: buffer of at least (K + M * N + M) float64 values, where K
+            is M * M, or the number of stored entries of a sparse Transition
+        M: number of hidden states
+        N: number of observation symbols
+        pattern: (indices, indptr) of a CSR Transition, or None if dense
+
+    Returns:
+        Transition, Emission and Initial views of shapes (M, M), (M, N)
+        and (M, 1); if pattern is given, Transition is the (nnz,) view of
+        the stored values, to be wrapped by pattern_matrix
+    """
+    K = M * M if pattern is None else pattern[0].shape[0]
+    flat = np.ndarray(K + M * N + M, dtype=np.float64, buffer=buffer)
+    Transition = flat[:K] if pattern is not None else \
+        flat[:K].reshape(M, M)
+    return (Transition, flat[K:K + M * N].reshape(M, N),
+            flat[K + M * N:].reshape(M, 1))
+
+
+def pattern_matrix(values, pattern, M):
+    """Wrap stored values in a CSR matrix without copying them.
+
+    Args:
+        values: numpy.ndarray of shape (nnz,) with the stored values
+        pattern: (indices, indptr) of the CSR matrix
+        M: number of rows and columns
+
+    Returns:
+        scipy.sparse CSR matrix of shape (M, M) whose data is values
+    """
+    # The constructor copies its data, so the view is put back after it;
+    # a copy here would leave the worker on a stale Transition
+    matrix = sparse.csr_matrix((values, *pattern), shape=(M, M))
+    matrix.data = values
+    if not np.shares_memory(matrix.data, values):
+        raise RuntimeError("CSR matrix does not share the Transition values")
+    return matrix
+
+
+# Shared memory attached by every worker process
+_worker = {}
+
+
+def _attach(model_name, data_name, M, N, S, T, pattern=None):
+    """Attach a worker process to the shared model and observations."""
+    model = shared_memory.SharedMemory(name=model_name)
+    data = shared_memory.SharedMemory(name=data_name)
+    ints = np.ndarray(S * T + S, dtype=np.int64, buffer=data.buf)
+    _worker['memory'] = (model, data)
+    _worker['model'] = model_views(model.buf, M, N, pattern)
+    _worker['pattern'] = pattern
+    _worker['obs'] = ints[:S * T].reshape(S, T)
+    _worker['lengths'] = ints[S * T:]
+
+
+def _shard_counts(start, stop, checkpoint=False):
+    """Compute the expected counts of sequences start to stop in a worker."""
+    lengths = _worker['lengths'][start:stop]
+    obs = _worker['obs'][start:stop, :lengths.max()]
+    counts = checkpointed_counts if checkpoint else expected_counts
+    Transition, Emission, Initial = _worker['model']
+    pattern = _worker['pattern']
+    if pattern is not None:
+        Transition = pattern_matrix(Transition, pattern,
+                                    Emission.shape[0])
+    return counts(obs, lengths, Transition, Emission, Initial)
+
+
+def _shards(lengths, workers):
+    """Split the sequences into contiguous ranges of similar total length.
+
+    Returns:
+        list of (start, stop) sequence index ranges, empty ranges removed
+    """
+    total = np.cumsum(lengths)
+    cuts = np.searchsorted(total, total[-1] * np.arange(1, workers) / workers)
+    bounds = np.concatenate(([0], cuts, [lengths.shape[0]]))
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])
+            if a < b]
+
+
+def baum_welch(Observations, Transition, Emission, Initial, iterations=1000,
+               lengths=None, tol=None, max_time=None, return_trace=False,
+               workers=None, checkpoint=False):
     """Perform the Baum-Welch algorithm for a hidden Markov model.
 
+    Several sequences are trained on together: their forward and backward
+    passes run as one batch and their expected counts are pooled into a
+    single M-step. With workers, the sequences are sharded across worker
+    processes that read the model from shared memory. With checkpoint,
+    the E-step runs in O(sqrt(T)) memory at the cost of a second forward
+    pass.
+
     Args:
-        Observations: numpy.ndarray of shape (T,) with observation indices
-        Transition: numpy.ndarray of shape (M, M) with transition probabilities
+        Observations: numpy.ndarray of shape (T,) with observation indices,
+            a list of such arrays, or a padded numpy.ndarray of shape (S, T)
+        Transition: numpy.ndarray or scipy.sparse matrix of shape (M, M) with
+            transition probabilities; a sparse Transition keeps its sparsity
+            pattern during training
         Emission: numpy.ndarray of shape (M, N) with emission probabilities
         Initial: numpy.ndarray of shape (M, 1) with initial state probabilities
         iterations: number of EM iterations to perform
+        lengths: numpy.ndarray of shape (S,) with the length of every row
+            of a padded Observations array, or None if all rows are full
+        tol: stop once the log-likelihood improves by less than tol
+        max_time: stop once the training has run for max_time seconds
+        return_trace: if True, also return the number of iterations run and
+            the log-likelihood trace
+        workers: number of processes running the E-step, or None
+        checkpoint: if True, compute the counts with checkpointed_counts
+            instead of keeping the full forward and backward matrices
 
     Returns:
-        Transition: converged transition probability matrix
+        Transition: converged transition probability matrix, in CSR format
+            if Transition was sparse
         Emission: converged emission probability matrix
-        or None, None on failure
+        iterations: number of iterations run, only if return_trace
+        trace: numpy.ndarray with the log-likelihood of the observations
+            under the model each iteration started from, only if
+            return_trace
+        or None, None (None, None, None, None if return_trace) on failure
     """
-    if not isinstance(Observations, np.ndarray) or Observations.ndim != 1:
-        return None, None
-    if not isinstance(Transition, np.ndarray) or Transition.ndim != 2:
-        return None, None
+    fail = (None,) * (4 if return_trace else 2)
+    obs, lengths = batch_observations(Observations, lengths)
+    if obs is None:
+        return fail
+    if not (isinstance(Transition, np.ndarray) or
+            sparse.issparse(Transition)) or Transition.ndim != 2:
+        return fail
     if not isinstance(Emission, np.ndarray) or Emission.ndim != 2:
-        return None, None
+        return fail
     if not isinstance(Initial, np.ndarray) or Initial.ndim != 2:
-        return None, None
+        return fail
     if not isinstance(iterations, int) or iterations < 1:
-        return None, None
+        return fail
+    if tol is not None and (not isinstance(tol, (int, float)) or tol < 0):
+        return fail
+    if max_time is not None and (not isinstance(max_time, (int, float)) or
+                                 max_time <= 0):
+        return fail
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        return fail
 
-    T = Observations.shape[0]
+    S, T = obs.shape
     M = Transition.shape[0]
     N = Emission.shape[1]
 
     if Transition.shape != (M, M):
-        return None, None
+        return fail
     if Emission.shape[0] != M:
-        return None, None
+        return fail
     if Initial.shape != (M, 1):
-        return None, None
-
-    for _ in range(iterations):
-        # Forward pass
-        F = np.zeros((M, T))
-        F[:, 0] = Initial[:, 0] * Emission[:, Observations[0]]
-        for t in range(1, T):
-            F[:, t] = (F[:, t - 1] @ Transition) * Emission[
-                :, Observations[t]]
-
-        # Backward pass
-        B = np.zeros((M, T))
-        B[:, T - 1] = 1
-        for t in range(T - 2, -1, -1):
-            B[:, t] = np.sum(
-                Transition * Emission[:, Observations[t + 1]] * B[:, t + 1],
-                axis=1
-            )
-
-        # Xi: (M, M, T-1) - joint probability of states at t and t+1
-        xi = np.zeros((M, M, T - 1))
-        for t in range(T - 1):
-            denom = np.sum(F[:, t, np.newaxis] * Transition *
-                           Emission[:, Observations[t + 1]] * B[:, t + 1])
-            xi[:, :, t] = (F[:, t, np.newaxis] * Transition *
-                           Emission[:, Observations[t + 1]] * B[:, t + 1]
-                           ) / denom
-
-        # Gamma: (M, T) - probability of being in state i at time t
-        gamma = np.sum(xi, axis=1)
-        gamma = np.concatenate(
-            (gamma, np.sum(xi[:, :, T - 2], axis=0, keepdims=True).T),
-            axis=1
-        )
-
-        # M-step: update Transition
-        Transition = np.sum(xi, axis=2) / np.sum(
-            gamma[:, :T - 1], axis=1, keepdims=True)
-
-        # M-step: update Emission
-        denom = np.sum(gamma, axis=1, keepdims=True)
-        for k in range(N):
-            Emission[:, k] = np.sum(gamma[:, Observations == k], axis=1)
-        Emission = Emission / denom
+        return fail
+
+    pattern = None
+    if sparse.issparse(Transition):
+        # Canonical CSR, so the counts line up with Transition.data
+        Transition = sparse.csr_matrix(Transition, dtype=float, copy=True)
+        Transition.sum_duplicates()
+        pattern = (Transition.indices, Transition.indptr)
+        rows = np.repeat(np.arange(M), np.diff(Transition.indptr))
+
+    counts_of = checkpointed_counts if checkpoint else expected_counts
+    shards = _shards(lengths, workers or 1)
+    executor = None
+    if len(shards) > 1:
+        # The observations are shared once; the model matrices are
+        # rewritten in place every iteration instead of being pickled
+        K = M * M if pattern is None else Transition.nnz
+        model = shared_memory.SharedMemory(
+            create=True, size=8 * (K + M * N + M))
+        data = shared_memory.SharedMemory(create=True, size=8 * (S * T + S))
+        ints = np.ndarray(S * T + S, dtype=np.int64, buffer=data.buf)
+        ints[:S * T] = obs.ravel()
+        ints[S * T:] = lengths
+        shared = model_views(model.buf, M, N, pattern)
+        shared[2][...] = Initial
+        executor = ProcessPoolExecutor(
+            len(shards), initializer=_attach,
+            initargs=(model.name, data.name, M, N, S, T, pattern))
+
+    start = time.monotonic()
+    trace = []
+    try:
+        for _ in range(iterations):
+            if executor is None:
+                counts = counts_of(obs, lengths, Transition, Emission,
+                                   Initial)
+            else:
+                shared[0][...] = Transition if pattern is None else \
+                    Transition.data
+                shared[1][...] = Emission
+                results = executor.map(_shard_counts, *zip(*shards),
+                                       [checkpoint] * len(shards))
+                counts = [sum(stat) for stat in zip(*results)]
+            xi_sum, emission_counts, gamma_sum, gamma_last, ll = counts
+            trace.append(ll)
+
+            # M-step
+            visits = gamma_sum - gamma_last
+            if pattern is None:
+                Transition = xi_sum / visits[:, np.newaxis]
+            else:
+                Transition = sparse.csr_matrix(
+                    (xi_sum / visits[rows], *pattern), shape=(M, M))
+            Emission = emission_counts / gamma_sum[:, np.newaxis]
+
+            if tol is not None and len(trace) > 1 and \
+                    abs(trace[-1] - trace[-2]) < tol:
+                break
+            if max_time is not None and time.monotonic() - start >= max_time:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+            shared = ints = None
+            for memory in (model, data):
+                memory.close()
+                memory.unlink()
 
+    if return_trace:
+        return Transition, Emission, len(trace), np.array(trace)
     return Transition, Emission
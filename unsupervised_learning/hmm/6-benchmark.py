@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Benchmarks the time per Baum-Welch iteration on a long sequence."""
+import sys
+import time
+import numpy as np
+baum_welch = __import__('6-baum_welch').baum_welch
+
+
+if __name__ == '__main__':
+    T = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    M, N = 20, 50
+    np.random.seed(0)
+    Transition = np.random.rand(M, M)
+    Transition /= Transition.sum(axis=1, keepdims=True)
+    Emission = np.random.rand(M, N)
+    Emission /= Emission.sum(axis=1, keepdims=True)
+    Initial = np.full((M, 1), 1 / M)
+    Observations = np.random.randint(0, N, T)
+
+    for iterations in (1, 5):
+        start = time.perf_counter()
+        baum_welch(Observations, Transition, Emission, Initial, iterations)
+        elapsed = time.perf_counter() - start
+        print("T={} M={} N={}: {} iterations in {:.3f}s, {:.3f}s per "
+              "iteration".format(T, M, N, iterations, elapsed,
+                                 elapsed / iterations))
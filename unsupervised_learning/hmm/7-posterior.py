@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Module for posterior decoding and smoothing of a hidden Markov model."""
+from collections import deque
+import numpy as np
+forward = __import__('3-forward').forward
+backward = __import__('5-backward').backward
+ForwardFilter = __import__('forward_filter').ForwardFilter
+
+
+def posterior(Observations, Transition, Emission, Initial):
+    """Calculate the posterior state probabilities of every step.
+
+    Unlike forward, backward and FixedLagSmoother, Transition comes before
+    Emission here; when N == M swapped arguments are not detected.
+
+    Args:
+        Observations: numpy.ndarray of shape (T,) with observation indices
+        Transition: numpy.ndarray of shape (N, N) with transition probabilities
+        Emission: numpy.ndarray of shape (N, M) with emission probabilities
+        Initial: numpy.ndarray of shape (N, 1) with initial state probabilities
+
+    Returns:
+        gamma: numpy.ndarray of shape (N, T) with P(state at t | obs)
+        or None on failure
+    """
+    _, F = forward(Observations, Emission, Transition, Initial, scaled=True)
+    if F is None:
+        return None
+    _, B = backward(Observations, Emission, Transition, Initial, scaled=True)
+
+    # Both passes are rescaled per step, so each column only needs its sum
+    gamma = F * B
+    gamma /= np.sum(gamma, axis=0)
+    return gamma
+
+
+class FixedLagSmoother:
+    """Fixed-lag smoother for a stream of observations.
+
+    The state at step t is estimated once the observations up to t + lag
+    have arrived, from the filtered belief at t and a backward pass over
+    the lag observations that followed it. Only the last lag + 1 filtered
+    beliefs are kept, so memory is O(lag * N) and latency is lag steps;
+    the backward pass is rerun for every event, costing O(lag * N^2).
+
+    Like forward, and unlike posterior, it takes Emission before
+    Transition; when N == M swapped arguments are not detected.
+
+    Attributes:
+        lag: number of future observations used by every estimate
+        t: number of smoothed estimates emitted so far
+    """
+
+    def __init__(self, Emission, Transition, Initial, lag):
+        """Initialize the smoother from the model parameters.
+
+        Args:
+            Emission: numpy.ndarray of shape (N, M) with emission
+                probabilities
+            Transition: numpy.ndarray of shape (N, N) with transition
+                probabilities
+            Initial: numpy.ndarray of shape (N, 1) with initial state
+                probabilities
+            lag: non-negative int, the number of steps every estimate waits
+        """
+        if not isinstance(lag, int) or lag < 0:
+            raise ValueError("lag must be a non-negative int")
+        self.filter = ForwardFilter(Emission, Transition, Initial)
+        self.lag = lag
+        self.t = 0
+        self.window = deque(maxlen=lag + 1)
+
+    def smooth(self):
+        """Estimate the oldest step of the window from the ones after it.
+
+        Returns:
+            numpy.ndarray of shape (N,) with P(state | obs up to newest)
+        """
+        beta = np.ones(self.filter.belief.shape[0])
+        for o, _ in list(self.window)[:0:-1]:
+            beta = self.filter.transition @ (self.filter.emission[o] * beta)
+            beta /= np.sum(beta)
+        estimate = self.window[0][1] * beta
+        return estimate / np.sum(estimate)
+
+    def update(self, obs):
+        """Fold one observation or a block of observations into the stream.
+
+        Args:
+            obs: observation index, or numpy.ndarray of shape (T,) with
+                observation indices in arrival order
+
+        Returns:
+            numpy.ndarray of shape (k, N) with the smoothed estimates of
+            the k steps that became lag steps old, possibly none
+        """
+        estimates = []
+        for o in np.atleast_1d(obs):
+            belief = self.filter.update(o)
+            self.window.append((o, belief))
+            if len(self.window) == self.lag + 1:
+                estimates.append(self.smooth())
+                self.t += 1
+        return np.array(estimates).reshape(
+            -1, self.filter.belief.shape[0])
+
+    def flush(self):
+        """Emit the remaining steps with the observations seen so far.
+
+        Every step still in the window is smoothed with the fewer than lag
+        observations after it and then dropped, so each step is emitted
+        exactly once; the filter keeps its state and later updates carry on
+        from the next step.
+
+        Returns:
+            numpy.ndarray of shape (k, N) with the smoothed estimates of the
+            steps still waiting for future observations
+        """
+        if len(self.window) == self.lag + 1:
+            self.window.popleft()
+        estimates = []
+        while self.window:
+            estimates.append(self.smooth())
+            self.window.popleft()
+            self.t += 1
+        return np.array(estimates).reshape(
+            -1, self.filter.belief.shape[0])
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Module for absorption analytics of an absorbing Markov chain."""
+import numpy as np
+from scipy import sparse
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import splu
+transition_graph = __import__('chain_graph').transition_graph
+reaches = __import__('chain_graph').reaches
+
+
+class AbsorbingChain:
+    """Absorbing Markov chain in canonical form.
+
+    The states are reordered as transient then absorbing, so that
+    P = [[Q, R], [0, I]]. I - Q is LU factored once and every product with
+    the fundamental matrix N = (I - Q)^-1 is a pair of triangular solves,
+    so N itself is never formed.
+
+    Attributes:
+        transient: numpy.ndarray of shape (t,) with the indices of the
+            transient states, in canonical order
+        absorbing: numpy.ndarray of shape (a,) with the indices of the
+            absorbing states, in canonical order
+        Q: transitions between transient states, of shape (t, t)
+        R: transitions from transient to absorbing states, of shape (t, a)
+    """
+
+    def __init__(self, P):
+        """Initialize the chain and factor I - Q.
+
+        Args:
+            P: numpy.ndarray or scipy.sparse matrix of shape (n, n), the
+                transition matrix of an absorbing Markov chain
+        """
+        graph = transition_graph(P)
+        if graph is None:
+            raise TypeError("P must be a square stochastic matrix")
+        absorbing = np.isclose(P.diagonal(), 1)
+        if not absorbing.any() or not reaches(graph, absorbing).all():
+            raise ValueError("P must be an absorbing chain")
+
+        self.transient = np.flatnonzero(~absorbing)
+        self.absorbing = np.flatnonzero(absorbing)
+        t = self.transient.shape[0]
+        if sparse.issparse(P):
+            rows = sparse.csr_matrix(P)[self.transient]
+            self.Q = rows[:, self.transient]
+            self.R = rows[:, self.absorbing]
+            self.lu = splu(sparse.csc_matrix(sparse.eye(t) - self.Q)) \
+                if t else None
+        else:
+            self.Q = P[np.ix_(self.transient, self.transient)]
+            self.R = P[np.ix_(self.transient, self.absorbing)]
+            self.lu = lu_factor(np.eye(t) - self.Q) if t else None
+        self.cache = {}
+
+    def solve(self, b):
+        """Multiply by the fundamental matrix, N @ b = (I - Q)^-1 @ b.
+
+        Args:
+            b: numpy.ndarray of shape (t,) or (t, k), one or k right-hand
+                sides over the transient states
+
+        Returns:
+            numpy.ndarray of the same shape as b
+        """
+        b = np.asarray(b, dtype=float)
+        if b.shape[0] != self.transient.shape[0]:
+            raise ValueError("b must have one row per transient state")
+        if self.lu is None:
+            return b.copy()
+        if isinstance(self.lu, tuple):
+            return lu_solve(self.lu, b)
+        return self.lu.solve(b)
+
+    def fundamental(self):
+        """Compute the fundamental matrix N = (I - Q)^-1.
+
+        Returns:
+            numpy.ndarray of shape (t, t), N[i, j] is the expected number
+            of visits to transient state j starting from transient state i
+        """
+        if 'N' not in self.cache:
+            self.cache['N'] = self.solve(np.eye(self.transient.shape[0]))
+        return self.cache['N']
+
+    def absorption_probabilities(self):
+        """Compute the absorption probabilities B = N R.
+
+        Returns:
+            numpy.ndarray of shape (t, a), B[i, j] is the probability of
+            being absorbed in absorbing state j from transient state i
+        """
+        if 'B' not in self.cache:
+            R = self.R.toarray() if sparse.issparse(self.R) else self.R
+            self.cache['B'] = self.solve(R)
+        return self.cache['B']
+
+    def expected_steps(self):
+        """Compute the expected number of steps before absorption, N 1.
+
+        Returns:
+            numpy.ndarray of shape (t,) with the expected number of steps
+            from every transient state
+        """
+        if 'steps' not in self.cache:
+            self.cache['steps'] = self.solve(
+                np.ones(self.transient.shape[0]))
+        return self.cache['steps']
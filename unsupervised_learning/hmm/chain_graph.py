@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Module for graph properties of the transition matrix of a Markov chain."""
+from math import gcd
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+
+def transition_graph(P):
+    """Validate a transition matrix and build the graph of its transitions.
+
+    Args:
+        P: numpy.ndarray or scipy.sparse matrix of shape (n, n), the
+            transition matrix
+
+    Returns:
+        scipy.sparse CSR matrix of shape (n, n) with an edge i -> j for
+        every P[i, j] > 0, or None if P is not a square stochastic matrix
+    """
+    if not (isinstance(P, np.ndarray) or sparse.issparse(P)) or P.ndim != 2:
+        return None
+    if P.shape[0] != P.shape[1]:
+        return None
+    if not np.isclose(np.asarray(P.sum(axis=1)).ravel(), 1).all():
+        return None
+    graph = sparse.csr_matrix(P > 0, dtype=np.int8)
+    graph.eliminate_zeros()
+    return graph
+
+
+def is_regular(graph):
+    """Check that some power of the transition matrix is all positive.
+
+    That holds iff the chain is irreducible, i.e. its graph is strongly
+    connected, and aperiodic, i.e. the gcd of its cycle lengths is 1.
+
+    Args:
+        graph: scipy.sparse matrix of shape (n, n) from transition_graph
+
+    Returns:
+        True if the chain is regular, False otherwise
+    """
+    count, _ = csgraph.connected_components(graph, directed=True,
+                                            connection='strong')
+    if count != 1:
+        return False
+
+    # With BFS levels from any state, the period is the gcd of
+    # level[i] + 1 - level[j] over all edges i -> j
+    level = csgraph.shortest_path(graph, unweighted=True, indices=0)
+    level = level.astype(np.int64)
+    edges = graph.tocoo()
+    period = 0
+    for d in np.unique(level[edges.row] + 1 - level[edges.col]):
+        period = gcd(period, int(d))
+        if period == 1:
+            return True
+    return False
+
+
+def reaches(graph, targets):
+    """Find the states with a path to any of the target states.
+
+    Args:
+        graph: scipy.sparse matrix of shape (n, n) from transition_graph
+        targets: numpy.ndarray of shape (n,) and dtype bool
+
+    Returns:
+        numpy.ndarray of shape (n,) and dtype bool, True for the targets
+        and every state that can reach one of them
+    """
+    n = graph.shape[0]
+    # One breadth-first search over the reversed edges, started from an
+    # extra state n with an edge to every target
+    edges = graph.tocoo()
+    sources = np.flatnonzero(targets)
+    rows = np.concatenate((edges.col, np.full(sources.shape[0], n)))
+    cols = np.concatenate((edges.row, sources))
+    reverse = sparse.csr_matrix((np.ones(rows.shape[0], dtype=np.int8),
+                                 (rows, cols)), shape=(n + 1, n + 1))
+    order = csgraph.breadth_first_order(reverse, n, directed=True,
+                                        return_predecessors=False)
+    reached = np.zeros(n + 1, dtype=bool)
+    reached[order] = True
+    return reached[:n]
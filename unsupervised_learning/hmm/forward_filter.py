@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Module for online forward filtering of a hidden Markov model."""
+import numpy as np
+from scipy import sparse
+
+
+class ForwardFilter:
+    """Incremental forward algorithm for a stream of observations.
+
+    Only the current filtered state distribution is kept, so memory is O(N)
+    however many observations have been seen, and every observation costs a
+    single vector-matrix product.
+
+    Attributes:
+        belief: numpy.ndarray of shape (N,) with P(state | obs so far), or
+            the initial distribution before the first update
+        log_likelihood: log-probability of all observations seen so far
+        t: number of observations seen so far
+    """
+
+    def __init__(self, Emission, Transition, Initial):
+        """Initialize the filter from the model parameters.
+
+        Args:
+            Emission: numpy.ndarray of shape (N, M) with emission
+                probabilities
+            Transition: numpy.ndarray or scipy.sparse matrix of shape
+                (N, N) with transition probabilities
+            Initial: numpy.ndarray of shape (N, 1) with initial state
+                probabilities
+        """
+        if not isinstance(Emission, np.ndarray) or Emission.ndim != 2:
+            raise TypeError("Emission must be a 2D numpy.ndarray")
+        N, M = Emission.shape
+        if not (isinstance(Transition, np.ndarray) or
+                sparse.issparse(Transition)) or Transition.shape != (N, N):
+            raise TypeError("Transition must be a numpy.ndarray or a sparse"
+                            " matrix of shape (N, N)")
+        if not isinstance(Initial, np.ndarray) or Initial.shape != (N, 1):
+            raise TypeError("Initial must be a numpy.ndarray of shape (N, 1)")
+
+        # Rows of the transposed emission matrix are contiguous per symbol
+        self.emission = np.ascontiguousarray(Emission.T, dtype=float)
+        if sparse.issparse(Transition):
+            self.transition = sparse.csr_matrix(Transition, dtype=float)
+        else:
+            self.transition = np.asarray(Transition, dtype=float)
+        self.belief = Initial[:, 0].astype(float)
+        self.log_likelihood = 0.0
+        self.t = 0
+
+    def update(self, obs):
+        """Fold one observation or a block of observations into the belief.
+
+        Args:
+            obs: observation index, or numpy.ndarray of shape (T,) with
+                observation indices in arrival order
+
+        Returns:
+            belief: numpy.ndarray of shape (N,) with the filtered state
+                distribution after the last observation
+        """
+        block = np.atleast_1d(obs)
+        if block.ndim != 1 or not np.issubdtype(block.dtype, np.integer):
+            raise TypeError("obs must be an int or a 1D array of ints")
+        if np.any(block < 0) or np.any(block >= self.emission.shape[0]):
+            raise ValueError("obs must be between 0 and M - 1")
+
+        belief = self.belief
+        log_likelihood = self.log_likelihood
+        t = self.t
+        for o in block:
+            if t:
+                belief = belief @ self.transition
+            belief = belief * self.emission[o]
+            # c = P(obs[t] | obs[:t]), so the log-likelihood is sum(log c)
+            c = np.sum(belief)
+            if c <= 0:
+                raise ValueError("obs has zero probability under the model")
+            belief /= c
+            log_likelihood += np.log(c)
+            t += 1
+
+        self.belief = belief
+        self.log_likelihood = log_likelihood
+        self.t = t
+        return belief
+
+    def predict(self, steps=1):
+        """Compute the state distribution a number of steps ahead.
+
+        Before the first update belief is the initial distribution, so
+        predict(steps) is then the prior distribution of step steps.
+
+        Args:
+            steps: number of transitions to look ahead
+
+        Returns:
+            numpy.ndarray of shape (N,) with P(state at t + steps | obs)
+        """
+        belief = self.belief
+        for _ in range(steps):
+            belief = belief @ self.transition
+        return belief
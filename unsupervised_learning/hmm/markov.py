@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Module for repeated state distribution queries on a Markov chain."""
+import numpy as np
+
+# Largest condition number of the eigenvector matrix for which P^t is
+# computed from the eigendecomposition; beyond it P is treated as defective
+EIG_MAX_COND = 1e8
+
+
+class MarkovChain:
+    """Markov chain whose transition matrix is factored once.
+
+    If P is diagonalizable, P^t = V diag(w^t) V^-1 and a query costs one
+    product with V^-1 whatever t is. Otherwise the repeated squarings
+    P, P^2, P^4, ... are cached and every horizon is reached from the
+    previous one with vector-matrix products only.
+
+    Attributes:
+        P: numpy.ndarray of shape (n, n), the transition matrix
+        spectral: True if queries use the eigendecomposition of P
+    """
+
+    def __init__(self, P):
+        """Initialize the chain and factor its transition matrix.
+
+        Args:
+            P: numpy.ndarray of shape (n, n), the transition matrix
+        """
+        if not isinstance(P, np.ndarray) or P.ndim != 2:
+            raise TypeError("P must be a 2D numpy.ndarray")
+        if P.shape[0] != P.shape[1]:
+            raise ValueError("P must be square")
+
+        self.P = P.astype(float)
+        self.squares = [self.P]
+        w, V = np.linalg.eig(self.P)
+        self.spectral = bool(np.linalg.cond(V) < EIG_MAX_COND)
+        if self.spectral:
+            self.eigenvalues = w
+            self.eigenvectors = V
+            self.inverse = np.linalg.inv(V)
+
+    def square(self, k):
+        """Get P^(2^k), squaring the cached powers as needed.
+
+        Args:
+            k: non-negative int
+
+        Returns:
+            numpy.ndarray of shape (n, n) with P^(2^k)
+        """
+        while len(self.squares) <= k:
+            self.squares.append(self.squares[-1] @ self.squares[-1])
+        return self.squares[k]
+
+    def distribution(self, s, t):
+        """Determine the state probabilities after every horizon.
+
+        Args:
+            s: numpy.ndarray of shape (k, n) with k starting state
+                distributions
+            t: int or sequence of h non-negative ints, the horizons
+
+        Returns:
+            numpy.ndarray of shape (h, k, n) with the state probabilities
+            of every start after every horizon, or (k, n) if t is an int
+        """
+        n = self.P.shape[0]
+        if not isinstance(s, np.ndarray) or s.ndim != 2 or s.shape[1] != n:
+            raise TypeError("s must be a numpy.ndarray of shape (k, n)")
+        horizons = np.atleast_1d(t)
+        if horizons.ndim != 1 or \
+                not np.issubdtype(horizons.dtype, np.integer) or \
+                np.any(horizons < 0):
+            raise ValueError("t must be non-negative ints")
+
+        if self.spectral:
+            powers = self.eigenvalues ** horizons[:, np.newaxis]
+            start = s @ self.eigenvectors
+            result = ((start * powers[:, np.newaxis]) @ self.inverse).real
+        else:
+            # Walk through the horizons in increasing order, each step
+            # applying the cached squarings of the gap from the previous one
+            result = np.empty((horizons.shape[0],) + s.shape)
+            order = np.argsort(horizons)
+            current = s.astype(float)
+            reached = 0
+            for i in order:
+                gap = int(horizons[i]) - reached
+                k = 0
+                while gap:
+                    if gap & 1:
+                        current = current @ self.square(k)
+                    gap >>= 1
+                    k += 1
+                reached = int(horizons[i])
+                result[i] = current
+
+        if np.ndim(t) == 0:
+            return result[0]
+        return result
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Module for batching observation sequences of a hidden Markov model."""
+import numpy as np
+
+
+def batch_observations(Observations, lengths=None):
+    """Arrange one or many observation sequences as a padded batch.
+
+    Args:
+        Observations: numpy.ndarray of shape (T,) with one sequence, a list
+            of such arrays, or a padded numpy.ndarray of shape (S, T)
+        lengths: numpy.ndarray of shape (S,) with the length of every row
+            of a padded array, or None if all rows are full
+
+    Returns:
+        obs: numpy.ndarray of shape (S, T) with padding set to 0
+        lengths: numpy.ndarray of shape (S,) with the sequence lengths
+        or None, None on failure
+    """
+    if isinstance(Observations, (list, tuple)):
+        if lengths is not None or not Observations:
+            return None, None
+        if not all(isinstance(o, np.ndarray) and o.ndim == 1 and o.size
+                   for o in Observations):
+            return None, None
+        lengths = np.array([o.shape[0] for o in Observations])
+        obs = np.zeros((len(Observations), lengths.max()), dtype=int)
+        for s, o in enumerate(Observations):
+            obs[s, :o.shape[0]] = o
+        return obs, lengths
+
+    if not isinstance(Observations, np.ndarray):
+        return None, None
+    if Observations.ndim == 1:
+        Observations = Observations[np.newaxis]
+    if Observations.ndim != 2 or Observations.shape[1] < 1:
+        return None, None
+    S, T = Observations.shape
+    if lengths is None:
+        lengths = np.full(S, T)
+    if not isinstance(lengths, np.ndarray) or lengths.shape != (S,):
+        return None, None
+    if np.any(lengths < 1) or np.any(lengths > T):
+        return None, None
+    active = np.arange(T) < lengths[:, np.newaxis]
+    return np.where(active, Observations, 0).astype(int), lengths
+
+
+def emissions(obs, lengths, Emission):
+    """Look up the emission probability of every observation in a batch.
+
+    Args:
+        obs: numpy.ndarray of shape (S, T) with padded observation indices
+        lengths: numpy.ndarray of shape (S,) with the sequence lengths
+        Emission: numpy.ndarray of shape (M, N) with emission probabilities
+
+    Returns:
+        numpy.ndarray of shape (S, T, M) with P(obs[s, t] | state), set to 1
+        past the end of a sequence so padding leaves the passes unchanged
+    """
+    T = obs.shape[1]
+    active = np.arange(T) < lengths[:, np.newaxis]
+    emit = Emission.T[obs]
+    emit[~active] = 1
+    return emit